@@ -0,0 +1,218 @@
+"""Offline end-to-end benchmark of the posting pipeline against local stand-ins
+
+Runs generate_post_content, get_person_urn and the outbox publish path
+post_once uses against benchmarks/standins.py in a scratch directory,
+then reports p50/p95/p99 latency per stage and posts per second. Results
+are written as JSON. Pass --baseline with an earlier results file to
+compare, and the run exits non-zero if any stage's p95 regressed by more
+than --max-regression.
+
+    python benchmarks/pipeline.py --posts 50 --latency 0.05 --error-rate 0.05 --output bench.json
+    python benchmarks/pipeline.py --posts 50 --latency 0.05 --baseline bench.json
+
+--media-size attaches --media-files generated images of that many bytes to
+every post and times the upload as the `media` stage.
+
+`publish` covers recovering earlier runs' outbox entries (including the
+lookup GET for ones a 5xx left "sending"), the durable outbox writes and
+the LinkedIn request, and the history record written on the way out,
+which is also reported on its own as `record`.
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import linkedin_auto_poster as poster
+from standins import StandinServer
+
+STAGES = ['generate', 'urn', 'media', 'publish', 'record', 'total']
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run_post(timings, errors, media_paths):
+    """One full pipeline pass, appending per-stage seconds to `timings`"""
+    started = time.perf_counter()
+    stage = 'generate'
+    try:
+        t = time.perf_counter()
+        content = poster.generate_post_content()
+        timings['generate'].append(time.perf_counter() - t)
+
+        stage = 'urn'
+        t = time.perf_counter()
+        person_urn = poster.get_person_urn()
+        timings['urn'].append(time.perf_counter() - t)
+
+        media = None
+        if media_paths:
+            stage = 'media'
+            t = time.perf_counter()
+            media = poster.upload_media(media_paths, person_urn=person_urn)
+            timings['media'].append(time.perf_counter() - t)
+            poster.forget_media_uploads(media)
+
+        stage = 'publish'
+        t = time.perf_counter()
+        # As post_once: settle what earlier posts left behind, then go through the outbox
+        retry = poster.recover_outbox(person_urn=person_urn)
+        if retry:
+            poster.publish_outbox_entry(retry, person_urn=person_urn)
+        entry = poster.outbox_add(content, media=media_paths)
+        published = poster.publish_outbox_entry(entry, person_urn=person_urn, media=media)
+        timings['publish'].append(time.perf_counter() - t)
+        timings['total'].append(time.perf_counter() - started)
+        if not published:
+            errors.append(f"publish: {entry.get('last_error', entry['state'])}")
+    except Exception as e:
+        errors.append(f"{stage}: {e}")
+
+def timed_records(timings):
+    """Wrap save_post_record so the outbox's history writes are timed as `record`"""
+    save_post_record = poster.save_post_record
+
+    @functools.wraps(save_post_record)
+    def timed(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return save_post_record(*args, **kwargs)
+        finally:
+            timings['record'].append(time.perf_counter() - t)
+    poster.save_post_record = timed
+
+def summarize(timings, errors, elapsed, posts):
+    stages = {}
+    for stage in STAGES:
+        values = timings[stage]
+        stages[stage] = {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 50) * 1000, 3) if values else None,
+            'p95_ms': round(percentile(values, 95) * 1000, 3) if values else None,
+            'p99_ms': round(percentile(values, 99) * 1000, 3) if values else None,
+        }
+    return {
+        'posts': posts,
+        'completed': len(timings['total']),
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        'elapsed_s': round(elapsed, 3),
+        'posts_per_second': round(len(timings['total']) / elapsed, 3) if elapsed else None,
+        'stages': stages,
+    }
+
+def compare(results, baseline, max_regression):
+    """Print p95 deltas against a baseline; returns the stages that regressed"""
+    regressed = []
+    print(f"\n{'stage':<10} {'baseline p95':>13} {'current p95':>12} {'change':>8}")
+    for stage in STAGES:
+        before = baseline['stages'].get(stage, {}).get('p95_ms')
+        after = results['stages'][stage]['p95_ms']
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        print(f"{stage:<10} {before:>11.1f}ms {after:>10.1f}ms {change:>+7.0%}")
+        if change > max_regression:
+            regressed.append(stage)
+    print(f"{'posts/s':<10} {baseline['posts_per_second']:>13} {results['posts_per_second']:>12}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stand-in responses that are 500s')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of stand-in responses that are 429s')
+    parser.add_argument('--long-rate', type=float, default=0.0, help='fraction of completions past the LinkedIn limit')
+    parser.add_argument('--banned-rate', type=float, default=0.0, help='fraction of completions with a banned phrase')
+    parser.add_argument('--media-size', type=int, default=0, help='bytes per attached image (0 for text posts)')
+    parser.add_argument('--media-files', type=int, default=1, help='images attached to each post')
+    parser.add_argument('--link-rate', type=float, default=0.0, help='fraction of completions citing stand-in links')
+    parser.add_argument('--dead-link-rate', type=float, default=0.0, help='fraction of cited links that are 404s')
+    parser.add_argument('--upload-error-rate', type=float, default=0.0, help='fraction of upload PUTs that fail')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed p95 slowdown per stage')
+    parser.add_argument('--verbose', action='store_true', help="show the poster's own output")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, long_rate=args.long_rate,
+        banned_rate=args.banned_rate, upload_error_rate=args.upload_error_rate,
+        link_rate=args.link_rate, dead_link_rate=args.dead_link_rate, seed=args.seed,
+    ).start()
+    poster.GROQ_API_URL = server.url + '/openai/v1/chat/completions'
+    poster.LINKEDIN_API_BASE = server.url
+    poster.GROQ_API_KEY = 'standin-groq-key'
+    poster.LINKEDIN_ACCESS_TOKEN = 'standin-linkedin-token'
+    poster.LINKEDIN_PERSON_URN = None
+    # The stand-in is local; don't let the default per-host limiter dominate the numbers
+    poster.HTTP_RATE_LIMITS['127.0.0.1'] = (10000, 10000)
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    timings = {stage: [] for stage in STAGES}
+    errors = []
+    timed_records(timings)
+    workdir = tempfile.mkdtemp(prefix='poster-bench-')
+    os.chdir(workdir)
+    media_paths = []
+    for i in range(args.media_files if args.media_size else 0):
+        media_paths.append(os.path.join(workdir, f'media{i}.png'))
+        with open(media_paths[-1], 'wb') as f:
+            f.write(os.urandom(args.media_size))
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, format='%(message)s', stream=sys.stdout)
+    log = sys.stdout if args.verbose else io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for _ in range(args.posts):
+                executor.submit(run_post, timings, errors, media_paths)
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    results = summarize(timings, errors, elapsed, args.posts)
+    results['config'] = vars(args)
+    results['standin_requests'] = server.requests
+
+    print(f"{'stage':<10} {'n':>5} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for stage in STAGES:
+        row = results['stages'][stage]
+        if row['count']:
+            print(f"{stage:<10} {row['count']:>5} {row['p50_ms']:>8.1f}ms {row['p95_ms']:>8.1f}ms {row['p99_ms']:>8.1f}ms")
+    print(f"\n{results['completed']}/{args.posts} posts in {elapsed:.2f}s "
+          f"({results['posts_per_second']} posts/s), {len(errors)} errors")
+    for error in errors[:5]:
+        print(f"  {error}")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        regressed = compare(results, baseline, args.max_regression)
+        if regressed:
+            print(f"❌ p95 regressed more than {args.max_regression:.0%} in: {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
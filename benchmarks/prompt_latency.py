@@ -0,0 +1,89 @@
+"""Compare Groq latency for the full and compact generation prompts
+
+Prints the estimated token count of every prompt section, then streams
+--runs completions per mode and reports time-to-first-token and total
+latency. Use --dry-run to print the token report without calling Groq.
+
+    GROQ_API_KEY=... python benchmarks/prompt_latency.py --runs 5 --budget 1200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import linkedin_auto_poster as poster
+
+def timed_completion(prompt_text):
+    """Stream one completion and return (ttft seconds, total seconds, prompt tokens)"""
+    headers = {
+        'Authorization': f'Bearer {poster.GROQ_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    data = dict(poster.completion_request(prompt_text), stream=True)
+
+    start = time.perf_counter()
+    first_token = None
+    usage = {}
+    response = poster.http_request('POST', poster.GROQ_API_URL, headers=headers, json=data, stream=True)
+    if response.status_code != 200:
+        raise Exception(f"Groq API error: {response.status_code} - {response.text}")
+
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data: '):
+            continue
+        payload = line[len('data: '):]
+        if payload == '[DONE]':
+            break
+        chunk = json.loads(payload)
+        if first_token is None and chunk['choices'] and chunk['choices'][0]['delta'].get('content'):
+            first_token = time.perf_counter()
+        usage = chunk.get('x_groq', {}).get('usage', usage)
+
+    total = time.perf_counter() - start
+    return (first_token or time.perf_counter()) - start, total, usage.get('prompt_tokens')
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='completions per prompt mode')
+    parser.add_argument('--budget', type=int, default=poster.PROMPT_TOKEN_BUDGET, help='compact prompt token budget')
+    parser.add_argument('--dry-run', action='store_true', help='only print the section token report')
+    args = parser.parse_args()
+
+    plan = poster.post_plan()
+    prompts = {
+        'full': poster.PROMPT_COMPILER.compile(plan, mode='full'),
+        'compact': poster.PROMPT_COMPILER.compile(plan, mode='compact', budget=args.budget),
+    }
+
+    for mode, prompt in prompts.items():
+        print(f"\n{mode} prompt: ~{prompt.tokens} tokens, {len(prompt.text)} characters")
+        for name, tokens in prompt.sections:
+            print(f"  {name:<20} {tokens:>6}")
+
+    if args.dry_run:
+        return
+    if not poster.GROQ_API_KEY:
+        raise SystemExit("GROQ_API_KEY is not set (use --dry-run for the token report only)")
+
+    print(f"\n{'mode':<8} {'prompt tok':>10} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'total p95':>10}")
+    for mode, prompt in prompts.items():
+        ttfts, totals, prompt_tokens = [], [], None
+        for _ in range(args.runs):
+            ttft, total, prompt_tokens = timed_completion(prompt.text)
+            ttfts.append(ttft)
+            totals.append(total)
+        print(
+            f"{mode:<8} {prompt_tokens or '?':>10} "
+            f"{statistics.median(ttfts):>8.2f}s {percentile(ttfts, 95):>8.2f}s "
+            f"{statistics.median(totals):>9.2f}s {percentile(totals, 95):>9.2f}s"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Local HTTP stand-ins for the Groq and LinkedIn endpoints the poster calls
+
+    server = StandinServer(latency=0.05, error_rate=0.02, rate_limit_rate=0.05)
+    server.start()
+    poster.GROQ_API_URL = server.url + '/openai/v1/chat/completions'
+    poster.LINKEDIN_API_BASE = server.url
+
+Every response waits `latency` seconds (+/- `jitter`). A fraction of
+requests fail with 500 (`error_rate`) or 429 with a Retry-After header
+(`rate_limit_rate`). Completions are random filler text; `long_rate` and
+`banned_rate` make them run past the LinkedIn limit or contain a banned
+phrase. Requests with "stream": true get a server-sent-event stream.
+
+Media uploads follow LinkedIn's assets API: registerUpload hands out one
+upload URL, or `part_size` byte ranges when a multipart upload is asked
+for, and `upload_error_rate` fails extra PUTs on top of the rates above.
+Uploaded byte counts per asset and part are kept in `uploads`. GET
+/v2/ugcPosts lists the posts received so far, newest first.
+
+A `link_rate` fraction of drafts end with a "Worth reading" block linking
+to /links/ok on this server, each link swapped for /links/gone (404) with
+probability `dead_link_rate`. /links/nohead answers HEAD with 405 and
+/links/slow takes `slow_link_delay` seconds.
+
+Engagement counts from the batch socialActions and memberCreatorPostAnalytics
+endpoints are derived from the post number, so repeated syncs agree.
+"""
+import sys
+import json
+import time
+import hashlib
+import random
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = (
+    'model data training research teams deploy inference agents benchmark latency cost '
+    'pipeline quality evaluation results paper dataset fine-tuning retrieval accuracy '
+    'production monitoring features labels drift scale open source release study shows'
+).split()
+
+class StandinServer:
+    """Threaded local server standing in for api.groq.com and api.linkedin.com"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=0.05, long_rate=0.0, banned_rate=0.0, part_size=1 << 20,
+                 upload_error_rate=0.0, link_rate=0.0, dead_link_rate=0.0, slow_link_delay=10.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.long_rate = long_rate
+        self.banned_rate = banned_rate
+        self.part_size = part_size
+        self.upload_error_rate = upload_error_rate
+        self.link_rate = link_rate
+        self.dead_link_rate = dead_link_rate
+        self.slow_link_delay = slow_link_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.posts = []
+        self.requests = {}
+        self.assets = {}
+        self.uploads = {}
+        self.httpd = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        handler = type('Handler', (_Handler,), {'standin': self})
+        self.httpd = _Server(('127.0.0.1', 0), handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def draft(self):
+        """Filler post text, occasionally too long or containing a banned phrase"""
+        with self.lock:
+            length = 3400 if self.random.random() < self.long_rate else self.random.randint(1500, 2600)
+            banned = self.random.random() < self.banned_rate
+            words = []
+            while sum(len(word) + 1 for word in words) < length:
+                words.append(self.random.choice(WORDS))
+        if banned:
+            words.insert(len(words) // 3, 'versus')
+        sentences = [' '.join(words[i:i + 12]).capitalize() + '.' for i in range(0, len(words), 12)]
+        return '\n\n'.join(' '.join(sentences[i:i + 4]) for i in range(0, len(sentences), 4))
+
+    def resources(self):
+        """A "Worth reading" block for a draft, or '' """
+        with self.lock:
+            if self.random.random() >= self.link_rate:
+                return ''
+            paths = ['gone' if self.random.random() < self.dead_link_rate else 'ok' for _ in range(2)]
+            paper = self.random.randint(1000, 9999)
+        return (
+            "\n\n📚 Worth reading:\n"
+            f"→ What it covers: Stand-in Lab (2024) - {self.url}/links/{paths[0]}?paper={paper}\n"
+            f"→ Why it's useful: Stand-in Report (2024) - {self.url}/links/{paths[1]}?report={paper}"
+        )
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream is expected, not a server error
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    standin = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_raw(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _read_body(self):
+        raw = self._read_raw()
+        return json.loads(raw) if raw else {}
+
+    def _simulate(self):
+        """Apply latency and injected failures; returns True if a failure was sent"""
+        standin = self.standin
+        path = self.path.split('?')[0]
+        if path.startswith(('/media/', '/links/')):
+            path = path.rsplit('/', 1)[0]
+        with standin.lock:
+            standin.requests[path] = standin.requests.get(path, 0) + 1
+            delay = max(0.0, standin.latency + standin.random.uniform(-standin.jitter, standin.jitter))
+        time.sleep(delay)
+        roll = standin.roll()
+        if roll < standin.rate_limit_rate:
+            self._send_json(429, {'message': 'rate limited'}, {'Retry-After': str(standin.retry_after)})
+            return True
+        if roll < standin.rate_limit_rate + standin.error_rate:
+            self._send_json(500, {'message': 'injected failure'})
+            return True
+        return False
+
+    def do_HEAD(self):
+        self._link(head=True)
+
+    def _link(self, head=False):
+        """Answer a /links/ request; the status alone matters to the link checker"""
+        if self._simulate():
+            return
+        kind = self.path.split('?')[0].rsplit('/', 1)[-1]
+        if kind == 'slow':
+            time.sleep(self.standin.slow_link_delay)
+        status = {'gone': 404, 'nohead': 405 if head else 200}.get(kind, 200)
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.startswith('/links/'):
+            self._link()
+            return
+        body = self._read_body()
+        if self._simulate():
+            return
+        path = self.path.split('?')[0]
+        if path == '/v2/userinfo':
+            self._send_json(200, {'sub': 'standin-member'})
+        elif path == '/v2/me':
+            self._send_json(200, {'id': 'standin-member'})
+        elif path == '/v2/ugcPosts':
+            with self.standin.lock:
+                posts = [dict(post, id=f"urn:li:share:{i + 1}") for i, post in enumerate(self.standin.posts)]
+            self._send_json(200, {'elements': posts[::-1][:20]})
+        elif path == '/v2/socialActions':
+            ids = self.path.split('ids=List(', 1)[1].rsplit(')', 1)[0].split(',')
+            results = {}
+            for post_id in map(unquote, ids):
+                number = int(post_id.rsplit(':', 1)[1])
+                results[post_id] = {
+                    'likesSummary': {'totalLikes': number * 7 % 97},
+                    'commentsSummary': {'aggregatedTotalComments': number * 3 % 13},
+                }
+            self._send_json(200, {'results': results, 'errors': {}})
+        elif path == '/rest/memberCreatorPostAnalytics':
+            post_id = unquote(self.path.split('entity=(', 1)[1].split(')', 1)[0].split(':', 1)[1])
+            self._send_json(200, {'elements': [{'count': int(post_id.rsplit(':', 1)[1]) * 131 % 5000}]})
+        else:
+            self._send_json(404, {'message': f'no stand-in for GET {path}', 'body': body})
+
+    def do_POST(self):
+        body = self._read_body()
+        if self._simulate():
+            return
+        path = self.path.split('?')[0]
+        if path == '/openai/v1/chat/completions':
+            self._completion(body)
+        elif path == '/v2/assets' and self.path.endswith('action=registerUpload'):
+            self._register_upload(body['registerUploadRequest'])
+        elif path == '/v2/assets' and self.path.endswith('action=completeMultiPartUpload'):
+            self._complete_upload(body['completeMultipartUploadRequest'])
+        elif path == '/v2/ugcPosts':
+            with self.standin.lock:
+                self.standin.posts.append(body)
+                post_id = f"urn:li:share:{len(self.standin.posts)}"
+            self._send_json(201, {'id': post_id}, {'x-restli-id': post_id})
+        else:
+            self._send_json(404, {'message': f'no stand-in for POST {path}'})
+
+    def do_PUT(self):
+        data = self._read_raw()
+        if self._simulate():
+            return
+        standin = self.standin
+        if standin.roll() < standin.upload_error_rate:
+            self._send_json(500, {'message': 'injected upload failure'})
+            return
+        _, _, asset_id, part = self.path.split('?')[0].split('/')
+        asset = f'urn:li:digitalmediaAsset:{asset_id}'
+        with standin.lock:
+            known = asset in standin.assets
+            if known:
+                standin.uploads.setdefault(asset, {})[int(part)] = len(data)
+        if not known:
+            self._send_json(404, {'message': f'unknown asset {asset}'})
+            return
+        self._send_json(201, {}, {'ETag': hashlib.md5(data).hexdigest()})
+
+    def _register_upload(self, request):
+        standin = self.standin
+        with standin.lock:
+            asset_id = f'standin{len(standin.assets) + 1}'
+            asset = f'urn:li:digitalmediaAsset:{asset_id}'
+            standin.assets[asset] = {'recipes': request['recipes'], 'size': request.get('fileSize')}
+        base = f"http://127.0.0.1:{self.server.server_port}/media/{asset_id}"
+        if 'MULTIPART_UPLOAD' in request.get('supportedUploadMechanism', []):
+            size = request['fileSize']
+            parts = [
+                {'url': f'{base}/{i}', 'headers': {'Content-Type': 'application/octet-stream'},
+                 'byteRange': {'firstByte': start, 'lastByte': min(size, start + standin.part_size) - 1}}
+                for i, start in enumerate(range(0, size, standin.part_size))
+            ]
+            mechanism = {'com.linkedin.digitalmedia.uploading.MultipartUpload': {
+                'metadata': asset_id, 'partUploadRequests': parts,
+            }}
+        else:
+            mechanism = {'com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest': {
+                'uploadUrl': f'{base}/0', 'headers': {'media-type-family': 'STILLIMAGE'},
+            }}
+        self._send_json(200, {'value': {
+            'asset': asset,
+            'mediaArtifact': f'urn:li:digitalmediaMediaArtifact:({asset},urn:li:digitalmediaMediaArtifactClass:uploaded)',
+            'uploadMechanism': mechanism,
+        }})
+
+    def _complete_upload(self, request):
+        standin = self.standin
+        asset = f"urn:li:digitalmediaAsset:{request['metadata']}"
+        with standin.lock:
+            uploaded = sorted(standin.uploads.get(asset, {}))
+            expected = -(-standin.assets[asset]['size'] // standin.part_size)
+        if uploaded != list(range(expected)) or len(request['partUploadResponses']) != expected:
+            self._send_json(400, {'message': f'{len(uploaded)}/{expected} parts uploaded'})
+            return
+        self._send_json(200, {})
+
+    def _completion(self, body):
+        if body.get('n', 1) != 1:
+            # Like Groq, which only supports n=1
+            self._send_json(400, {'error': {'message': "'n' : number must be at most 1"}})
+            return
+        prompt_tokens = sum(len(message['content'].split()) for message in body.get('messages', []))
+        drafts = [self.standin.draft() + self.standin.resources()]
+        completion_tokens = sum(len(draft.split()) for draft in drafts)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+        if not body.get('stream'):
+            self._send_json(200, {
+                'choices': [{'index': i, 'message': {'role': 'assistant', 'content': draft}} for i, draft in enumerate(drafts)],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for word in drafts[0].split(' '):
+                self._send_event({'choices': [{'index': 0, 'delta': {'content': word + ' '}}]})
+            self._send_event({'choices': [], 'x_groq': {'usage': usage}})
+            self._send_chunk(b'data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream early, which is what it is supposed to do
+            self.close_connection = True
+
+    def _send_event(self, event):
+        self._send_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+
+    def _send_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
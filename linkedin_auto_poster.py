@@ -1,72 +1,522 @@
 import os
+import sys
+import uuid
+import glob
+import asyncio
+import argparse
 import json
+import re
+import codecs
+import struct
+import time
+import random
+import string
+import hashlib
+import heapq
+import itertools
+import threading
+import contextvars
+import mmap
+import socket
+import logging
 import requests
-from datetime import datetime
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit, quote
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+# Progress and warnings; the command line shows them on stdout, library callers opt in
+log = logging.getLogger('linkedin_auto_poster')
 
 # Configuration from environment variables
 LINKEDIN_ACCESS_TOKEN = os.environ.get('LINKEDIN_ACCESS_TOKEN')
 LINKEDIN_PERSON_URN = os.environ.get('LINKEDIN_PERSON_URN')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+GROQ_API_URL = os.environ.get('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+LINKEDIN_API_BASE = os.environ.get('LINKEDIN_API_BASE', 'https://api.linkedin.com')
 
-def generate_post_content():
-    """Generate viral LinkedIn post content using advanced engagement strategies"""
-    
-    # Verify API key exists
-    if not GROQ_API_KEY or GROQ_API_KEY == "":
-        raise Exception("GROQ_API_KEY environment variable is not set or empty")
-    
-    # Debug: Show first/last chars of key (for troubleshooting)
-    key_preview = f"{GROQ_API_KEY[:10]}...{GROQ_API_KEY[-10:]}" if len(GROQ_API_KEY) > 20 else "KEY TOO SHORT"
-    print(f"Using Groq API key: {key_preview}")
-    print(f"Key length: {len(GROQ_API_KEY)} characters")
-    
-    # Determine day-specific theme
-    day_of_week = datetime.now().strftime('%A')
-    day_themes = {
-        'Monday': '💡 Machine Learning Monday',
-        'Tuesday': '🤖 AI Tuesday',
-        'Wednesday': '🧠 Deep Learning Wednesday',
-        'Thursday': '📊 Analytics Thursday',
-        'Friday': '💰 FinTech Friday',
-        'Saturday': '🔬 Data Science Saturday',
-        'Sunday': '🌐 Industry Insights Sunday'
-    }
-    theme = day_themes.get(day_of_week, '🚀 Data Science Insights')
-    
-    # Advanced post type rotation with viral mechanics
-    viral_formats = [
-        {'type': 'contrarian_insight', 'hook': 'what nobody tells you', 'title_style': 'The [Stat]% Truth About [Topic]'},
-        {'type': 'transformation_story', 'hook': 'before/after numbers', 'title_style': 'How [Company Type] Saved $[Amount] With [Tech]'},
-        {'type': 'mistake_autopsy', 'hook': 'costly failure', 'title_style': 'Why [Stat]% of [Initiatives] Fail (And How to Avoid It)'},
-        {'type': 'step_by_step', 'hook': 'exact process', 'title_style': 'The [Number]-Step Framework to [Outcome]'},
-        {'type': 'trend_analysis', 'hook': 'emerging shift', 'title_style': '[Stat]% of [Industry] Are Making This Shift'},
-        {'type': 'counterintuitive', 'hook': 'opposite of common belief', 'title_style': 'Why [Common Belief] Is Wrong About [Topic]'},
-        {'type': 'implementation', 'hook': 'how we built it', 'title_style': 'Inside [Company Type]\'s $[Amount] [Tech] Rollout'},
-        {'type': 'data_story', 'hook': 'surprising statistics', 'title_style': '[Stat]% of [Industry] Still Don\'t Know This'},
-        {'type': 'problem_solution', 'hook': 'hidden challenge', 'title_style': 'Solving the $[Amount] [Problem] in [Industry]'},
-        {'type': 'future_forecast', 'hook': 'next 12 months', 'title_style': 'What [Industry] Will Look Like in [Timeframe]'}
-    ]
-    day_number = datetime.now().timetuple().tm_yday
-    post_format = viral_formats[day_number % len(viral_formats)]
-    
-    # Industry focus (60% BFSI, 40% others) with neutral positioning
-    if day_number % 5 < 3:
-        industry_focus = 'BFSI'
-        industry_hashtags = '#BFSI #FinTech #BankingAnalytics'
-        pain_points = 'fraud detection, risk assessment, customer retention, operational efficiency'
-    else:
-        industries = [
-            ('Retail', '#RetailTech #Ecommerce #CustomerAnalytics', 'inventory optimization, demand forecasting, personalization'),
-            ('Healthcare', '#HealthTech #HealthcareAI #MedTech', 'patient outcomes, diagnostic accuracy, operational efficiency'),
-            ('Manufacturing', '#Industry40 #SmartManufacturing #IoT', 'predictive maintenance, quality control, yield optimization')
+# HTTP client: (connect, read) timeouts and (requests/second, burst) limits per host
+HTTP_TIMEOUTS = {
+    'api.groq.com': (5, 30),
+    'api.linkedin.com': (5, 15),
+}
+HTTP_DEFAULT_TIMEOUT = (5, 30)
+HTTP_RATE_LIMITS = {
+    'api.groq.com': (0.5, 5),
+    'api.linkedin.com': (2, 5),
+}
+HTTP_DEFAULT_RATE_LIMIT = (10, 10)
+# Per access token on top of the per-host limit, so one account can't use up the app's share
+HTTP_ACCOUNT_RATE_LIMITS = {
+    'api.linkedin.com': (0.5, 3),
+}
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))
+HTTP_MAX_BACKOFF = float(os.environ.get('HTTP_MAX_BACKOFF', '60'))
+
+# Generation budget: candidates per round, and hard caps across all rounds
+GENERATION_CANDIDATES = int(os.environ.get('GENERATION_CANDIDATES', '3'))
+GENERATION_MAX_ATTEMPTS = int(os.environ.get('GENERATION_MAX_ATTEMPTS', '6'))
+GENERATION_TOKEN_BUDGET = int(os.environ.get('GENERATION_TOKEN_BUDGET', '40000'))
+GENERATION_TIME_BUDGET = float(os.environ.get('GENERATION_TIME_BUDGET', '75'))
+GROQ_STREAM = os.environ.get('GROQ_STREAM', '') == '1'  # stream drafts and abort bad ones early
+
+# LLM backends: OpenAI-compatible endpoints tried in order. LLM_BACKENDS is a JSON
+# list of {name, url, model, api_key_env, timeout}; without it Groq is the only
+# backend, plus LLM_FALLBACK_MODEL on the same endpoint if set.
+LLM_BACKENDS = os.environ.get('LLM_BACKENDS', '')
+LLM_FALLBACK_MODEL = os.environ.get('LLM_FALLBACK_MODEL', '')
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', '95'))  # hedge once a call is slower than this
+LLM_HEDGE_DELAY = float(os.environ.get('LLM_HEDGE_DELAY', '10'))  # seconds, until there are enough samples
+LLM_HEDGE_MIN_SAMPLES = 5
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', '3'))  # consecutive failures that open the circuit
+LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', '300'))
+LLM_HEALTH_FILE = os.environ.get('LLM_HEALTH_FILE', '.llm_backends.json')
+
+# Prompt size: 'full' sends the whole skeleton, 'compact' trims it to the token budget
+PROMPT_MODE = os.environ.get('PROMPT_MODE', 'full')
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', '1200'))
+
+# Topic planner: pick the least recently used topic and sources from the history
+TOPIC_PLANNER = os.environ.get('TOPIC_PLANNER', '1') == '1'
+TOPIC_PLANNER_FILE = os.environ.get('TOPIC_PLANNER_FILE', '.topic_planner.json')
+
+# Resolved person URNs, keyed by a hash of the access token
+URN_CACHE_FILE = os.environ.get('URN_CACHE_FILE', '.linkedin_urn_cache.json')
+URN_CACHE_TTL = float(os.environ.get('URN_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Batch mode: accounts processed at once
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '4'))
+
+# Pre-generated drafts, one file per scheduled slot (UTC, matching the workflow cron)
+QUEUE_DIR = os.environ.get('POST_QUEUE_DIR', 'queue')
+QUEUE_CLAIM_TIMEOUT = 600  # seconds before a claimed draft counts as abandoned by a crashed publisher
+POST_SCHEDULE_DAYS = [day.strip() for day in os.environ.get('POST_SCHEDULE_DAYS', 'Monday').split(',')]
+POST_SCHEDULE_TIME = os.environ.get('POST_SCHEDULE_TIME', '08:00')
+
+# Outbox: drafts written ahead of publishing, retried until LinkedIn has them
+OUTBOX_DIR = os.environ.get('POST_OUTBOX_DIR', 'outbox')
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+
+# Run instrumentation: one JSON line per run, a Prometheus textfile, opt-in profiling
+METRICS_FILE = os.environ.get('METRICS_FILE', 'metrics.jsonl')
+METRICS_PROM_FILE = os.environ.get('METRICS_PROM_FILE', 'linkedin_poster.prom')
+POSTER_PROFILE = os.environ.get('POSTER_PROFILE', '') == '1'  # cProfile + tracemalloc
+GROQ_PRICE_INPUT = float(os.environ.get('GROQ_PRICE_INPUT', '0.59'))  # USD per million prompt tokens
+GROQ_PRICE_OUTPUT = float(os.environ.get('GROQ_PRICE_OUTPUT', '0.79'))  # USD per million completion tokens
+
+# Post history: append-only JSON lines, optionally one file per month
+HISTORY_FILE = os.environ.get('POST_HISTORY_FILE', 'posts.jsonl')
+HISTORY_SHARDING = os.environ.get('POST_HISTORY_SHARDING', 'none')  # 'none' or 'monthly'
+LEGACY_HISTORY_FILE = 'posts.json'
+
+# Style linter: drafts whose penalty goes over this are discarded
+LINT_MAX_PENALTY = int(os.environ.get('LINT_MAX_PENALTY', '12'))
+LINT_MAX_SENTENCE_WORDS = int(os.environ.get('LINT_MAX_SENTENCE_WORDS', '30'))
+
+# Link verification for the URLs a draft cites
+LINK_CHECK = os.environ.get('LINK_CHECK', '1') == '1'
+LINK_POLICY = os.environ.get('LINK_POLICY', 'repair')  # 'repair' drops lines with dead links, 'reject' drops the draft
+LINK_RECHECK_ON_PUBLISH = os.environ.get('LINK_RECHECK_ON_PUBLISH', '') == '1'  # otherwise publishing only uses cached results
+LINK_CHECK_BUDGET = float(os.environ.get('LINK_CHECK_BUDGET', '8'))  # seconds for all links of a draft
+LINK_CHECK_TIMEOUT = (3, 5)
+LINK_CHECK_CONCURRENCY = int(os.environ.get('LINK_CHECK_CONCURRENCY', '8'))
+LINK_CACHE_FILE = os.environ.get('LINK_CACHE_FILE', '.link_cache.json')
+LINK_CACHE_TTL = float(os.environ.get('LINK_CACHE_TTL', str(7 * 24 * 3600)))
+LINK_CACHE_DEAD_TTL = float(os.environ.get('LINK_CACHE_DEAD_TTL', str(24 * 3600)))
+
+# Engagement metrics per published post, refreshed less often as posts age
+ENGAGEMENT_FILE = os.environ.get('ENGAGEMENT_FILE', 'engagement.json')
+ENGAGEMENT_BATCH_SIZE = int(os.environ.get('ENGAGEMENT_BATCH_SIZE', '20'))  # posts per socialActions call
+ENGAGEMENT_CONCURRENCY = int(os.environ.get('ENGAGEMENT_CONCURRENCY', '4'))
+ENGAGEMENT_REFRESH = [  # (post age, refresh interval) in seconds
+    (2 * 24 * 3600, 3600),
+    (14 * 24 * 3600, 12 * 3600),
+    (90 * 24 * 3600, 7 * 24 * 3600),
+]  # older posts are not refreshed again
+LINKEDIN_API_VERSION = os.environ.get('LINKEDIN_API_VERSION', '202409')  # for the versioned /rest API
+ENGAGEMENT_WEIGHTS = {'likes': 1.0, 'comments': 3.0}  # engagement score of a post
+
+# Plan optimizer: 'off' keeps the day-of-year rotation, 'bandit' picks format,
+# industry and booster from engagement (needs numpy)
+POST_OPTIMIZER = os.environ.get('POST_OPTIMIZER', 'off')
+OPTIMIZER_HALF_LIFE_DAYS = float(os.environ.get('OPTIMIZER_HALF_LIFE_DAYS', '180'))  # older engagement counts less
+OPTIMIZER_PRIOR_POSTS = 2.0  # pseudo-posts at the overall mean added to every option
+
+# Near-duplicate detection against published posts
+DUPLICATE_INDEX_FILE = os.environ.get('DUPLICATE_INDEX_FILE', 'posts.minhash.jsonl')
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', '0.5'))  # estimated Jaccard similarity
+DUPLICATE_POLICY = os.environ.get('DUPLICATE_POLICY', 'reject')  # 'reject' or 'flag'
+
+# Media uploads: files attached to the post, streamed from disk in chunks
+POST_MEDIA = [path.strip() for path in os.environ.get('POST_MEDIA', '').split(',') if path.strip()]
+MEDIA_CHUNK_SIZE = int(os.environ.get('MEDIA_CHUNK_SIZE', str(1 << 20)))
+MEDIA_MEMORY_CEILING = int(os.environ.get('MEDIA_MEMORY_CEILING', str(16 << 20)))  # bytes in flight across uploads
+MEDIA_CONCURRENCY = int(os.environ.get('MEDIA_CONCURRENCY', '4'))
+MEDIA_MULTIPART_THRESHOLD = int(os.environ.get('MEDIA_MULTIPART_THRESHOLD', str(8 << 20)))  # resumable above this
+MEDIA_UPLOAD_TIMEOUT = (5, 120)
+MEDIA_RESUME_TTL = float(os.environ.get('MEDIA_RESUME_TTL', str(12 * 3600)))  # upload URLs expire
+
+class RunMetrics:
+    """Stage timings and counters for one run of the poster
+
+    Stages and counters can be recorded from any thread. finish() appends
+    the run to METRICS_FILE and rewrites METRICS_PROM_FILE.
+    """
+    
+    def __init__(self, command, profile=False):
+        self.lock = threading.Lock()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.started_at = datetime.now().isoformat()
+        self.started = time.monotonic()
+        self.stages = {}
+        self.counters = {}
+        self.http = {}
+        self.profiler = None
+        if profile:
+            import cProfile
+            import tracemalloc
+            tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+    
+    @contextmanager
+    def stage(self, name):
+        """Time a block; failures are recorded and re-raised"""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            with self.lock:
+                self.stages[name] = {'seconds': round(time.monotonic() - started, 4), 'ok': ok}
+    
+    def add(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def observe_http(self, host, status, retries):
+        with self.lock:
+            key = f"{host} {status}"
+            self.http[key] = self.http.get(key, 0) + 1
+            self.counters['http_retries'] = self.counters.get('http_retries', 0) + retries
+    
+    def finish(self, outcome):
+        """Write this run to the metrics log and the Prometheus textfile"""
+        if self.profiler is not None:
+            import tracemalloc
+            self.profiler.disable()
+            self.profiler.dump_stats(f"profile-{self.run_id}.pstats")
+            self.counters['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        
+        prompt_tokens = self.counters.get('groq_prompt_tokens', 0)
+        completion_tokens = self.counters.get('groq_completion_tokens', 0)
+        record = {
+            'run_id': self.run_id,
+            'command': self.command,
+            'started_at': self.started_at,
+            'outcome': outcome,
+            'seconds': round(time.monotonic() - self.started, 4),
+            'stages': self.stages,
+            'counters': self.counters,
+            'http': self.http,
+            'groq_cost_usd': round((prompt_tokens * GROQ_PRICE_INPUT + completion_tokens * GROQ_PRICE_OUTPUT) / 1e6, 6),
+        }
+        with _file_lock(state_path(METRICS_FILE)):
+            with open(state_path(METRICS_FILE), 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        self._write_prometheus(record)
+        return record
+    
+    def _write_prometheus(self, record):
+        lines = [
+            '# HELP linkedin_poster_last_run_success Whether the last run succeeded',
+            '# TYPE linkedin_poster_last_run_success gauge',
+            f'linkedin_poster_last_run_success{{command="{self.command}"}} {int(record["outcome"] == "success")}',
+            '# HELP linkedin_poster_last_run_timestamp_seconds When the last run finished',
+            '# TYPE linkedin_poster_last_run_timestamp_seconds gauge',
+            f'linkedin_poster_last_run_timestamp_seconds{{command="{self.command}"}} {time.time():.0f}',
+            '# HELP linkedin_poster_run_seconds Wall time of the last run',
+            '# TYPE linkedin_poster_run_seconds gauge',
+            f'linkedin_poster_run_seconds{{command="{self.command}"}} {record["seconds"]}',
+            '# HELP linkedin_poster_stage_seconds Wall time of each stage in the last run',
+            '# TYPE linkedin_poster_stage_seconds gauge',
         ]
-        industry_focus, industry_hashtags, pain_points = industries[day_number % len(industries)]
+        lines += [f'linkedin_poster_stage_seconds{{stage="{name}"}} {stage["seconds"]}' for name, stage in self.stages.items()]
+        lines += [
+            '# HELP linkedin_poster_counter Counters from the last run (tokens, attempts, retries)',
+            '# TYPE linkedin_poster_counter gauge',
+        ]
+        lines += [f'linkedin_poster_counter{{name="{name}"}} {value}' for name, value in self.counters.items()]
+        lines += [
+            '# HELP linkedin_poster_http_responses HTTP responses in the last run by host and status',
+            '# TYPE linkedin_poster_http_responses gauge',
+        ]
+        for key, count in self.http.items():
+            host, status = key.split(' ')
+            lines.append(f'linkedin_poster_http_responses{{host="{host}",status="{status}"}} {count}')
+        lines += [
+            '# HELP linkedin_poster_groq_cost_usd Estimated Groq cost of the last run',
+            '# TYPE linkedin_poster_groq_cost_usd gauge',
+            f'linkedin_poster_groq_cost_usd {record["groq_cost_usd"]}',
+        ]
+        
+        # Write then rename so node_exporter never reads a half-written file
+        tmp_path = state_path(METRICS_PROM_FILE) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, state_path(METRICS_PROM_FILE))
+
+_run_metrics = RunMetrics('library')
+
+# Set while a Poster method runs, and carried into the worker threads it starts (see _submit)
+_poster_metrics = contextvars.ContextVar('poster_metrics', default=None)
+_poster_data_dir = contextvars.ContextVar('poster_data_dir', default=None)
+
+def run_metrics():
+    """Metrics collector for the current run, or of the Poster being called"""
+    metrics = _poster_metrics.get()
+    return _run_metrics if metrics is None else metrics
+
+def state_path(path):
+    """Where a configured state file or directory is
+
+    Inside a Poster call it is in that Poster's data directory, under the
+    configured name; otherwise it is where the configuration says.
+    """
+    data_dir = _poster_data_dir.get()
+    return path if data_dir is None else os.path.join(data_dir, os.path.basename(path))
+
+def _submit(executor, fn, *args, **kwargs):
+    """executor.submit, keeping the calling Poster's data directory and metrics"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def start_run(command):
+    """Begin collecting metrics for a new run"""
+    global _run_metrics
+    _run_metrics = RunMetrics(command, profile=POSTER_PROFILE)
+    return _run_metrics
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_http_session = None
+_rate_limiters = {}
+_http_lock = threading.Lock()
+
+def http_session():
+    """Shared keep-alive session so each host pays the TCP/TLS handshake once
+
+    Every thread and account sends through it, so its cookie jar accepts
+    nothing: a cookie LinkedIn sets for one token would otherwise go out
+    with every other account's requests.
+    """
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=32)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+def _rate_limiter(host):
+    with _http_lock:
+        if host not in _rate_limiters:
+            _rate_limiters[host] = TokenBucket(*HTTP_RATE_LIMITS.get(host, HTTP_DEFAULT_RATE_LIMIT))
+        return _rate_limiters[host]
+
+def _account_rate_limiter(host, headers):
+    """The limiter for the access token in `headers` on this host, or None"""
+    authorization = (headers or {}).get('Authorization')
+    if host not in HTTP_ACCOUNT_RATE_LIMITS or not authorization:
+        return None
+    key = (host, hashlib.sha256(authorization.encode('utf-8')).hexdigest())
+    with _http_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = TokenBucket(*HTTP_ACCOUNT_RATE_LIMITS[host])
+        return _rate_limiters[key]
+
+def _retry_after(response):
+    """Seconds to wait according to a Retry-After header, or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(HTTP_MAX_BACKOFF, 2 ** attempt))
+
+def http_request(method, url, timeout=None, retries=None, idempotent=True, **kwargs):
+    """Send a request through the shared session with rate limiting and retries
+
+    429 and 5xx responses and connection failures are retried with jittered
+    exponential backoff, honoring Retry-After. Non-idempotent requests are
+    only retried when the server cannot have acted on them (429 or a
+    connect timeout). The returned response carries the retry count in
+    `response.retries`.
     
-    # Additional viral mechanics
-    engagement_boosters = ['📌 Pro tip:', '⚡ Quick win:', '🎯 Key insight:', '💎 Golden rule:', '🔑 Critical factor:', '⚠️ Watch out:', '✨ Breakthrough:', '🚨 Reality check:']
-    booster = engagement_boosters[day_number % len(engagement_boosters)]
+    Every request takes a token from its host's limiter and, for hosts in
+    HTTP_ACCOUNT_RATE_LIMITS, from the limiter of the access token it
+    carries, so each account in a batch has a budget of its own.
+    """
+    host = urlsplit(url).hostname
+    limiter = _rate_limiter(host)
+    account_limiter = _account_rate_limiter(host, kwargs.get('headers'))
+    if timeout is None:
+        timeout = HTTP_TIMEOUTS.get(host, HTTP_DEFAULT_TIMEOUT)
+    if retries is None:
+        retries = HTTP_MAX_RETRIES
     
-    prompt = f"""You are an AI/ML professional sharing REAL insights about trends, research, and developments. Write like a smart, friendly person explaining something clearly to another person.
+    for attempt in range(retries + 1):
+        if account_limiter is not None:
+            account_limiter.acquire()
+        limiter.acquire()
+        try:
+            response = http_session().request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            if attempt == retries or not retryable:
+                run_metrics().observe_http(host, type(e).__name__, attempt)
+                raise
+            reason = type(e).__name__
+            delay = _backoff(attempt)
+        else:
+            retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+            if attempt == retries or not retryable:
+                response.retries = attempt
+                run_metrics().observe_http(host, response.status_code, attempt)
+                return response
+            reason = f"HTTP {response.status_code}"
+            delay = min(HTTP_MAX_BACKOFF, _retry_after(response) or _backoff(attempt))
+            response.close()
+        log.info(f"⏳ {method} {host} failed ({reason}), retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+DAY_THEMES = {
+    'Monday': '💡 Machine Learning Monday',
+    'Tuesday': '🤖 AI Tuesday',
+    'Wednesday': '🧠 Deep Learning Wednesday',
+    'Thursday': '📊 Analytics Thursday',
+    'Friday': '💰 FinTech Friday',
+    'Saturday': '🔬 Data Science Saturday',
+    'Sunday': '🌐 Industry Insights Sunday'
+}
+
+# Advanced post type rotation with viral mechanics
+VIRAL_FORMATS = [
+    {'type': 'contrarian_insight', 'hook': 'what nobody tells you', 'title_style': 'The [Stat]% Truth About [Topic]'},
+    {'type': 'transformation_story', 'hook': 'before/after numbers', 'title_style': 'How [Company Type] Saved $[Amount] With [Tech]'},
+    {'type': 'mistake_autopsy', 'hook': 'costly failure', 'title_style': 'Why [Stat]% of [Initiatives] Fail (And How to Avoid It)'},
+    {'type': 'step_by_step', 'hook': 'exact process', 'title_style': 'The [Number]-Step Framework to [Outcome]'},
+    {'type': 'trend_analysis', 'hook': 'emerging shift', 'title_style': '[Stat]% of [Industry] Are Making This Shift'},
+    {'type': 'counterintuitive', 'hook': 'opposite of common belief', 'title_style': 'Why [Common Belief] Is Wrong About [Topic]'},
+    {'type': 'implementation', 'hook': 'how we built it', 'title_style': 'Inside [Company Type]\'s $[Amount] [Tech] Rollout'},
+    {'type': 'data_story', 'hook': 'surprising statistics', 'title_style': '[Stat]% of [Industry] Still Don\'t Know This'},
+    {'type': 'problem_solution', 'hook': 'hidden challenge', 'title_style': 'Solving the $[Amount] [Problem] in [Industry]'},
+    {'type': 'future_forecast', 'hook': 'next 12 months', 'title_style': 'What [Industry] Will Look Like in [Timeframe]'}
+]
+
+# Industry focus (60% BFSI, 40% others) with neutral positioning
+BFSI_INDUSTRY = ('BFSI', '#BFSI #FinTech #BankingAnalytics', 'fraud detection, risk assessment, customer retention, operational efficiency')
+OTHER_INDUSTRIES = [
+    ('Retail', '#RetailTech #Ecommerce #CustomerAnalytics', 'inventory optimization, demand forecasting, personalization'),
+    ('Healthcare', '#HealthTech #HealthcareAI #MedTech', 'patient outcomes, diagnostic accuracy, operational efficiency'),
+    ('Manufacturing', '#Industry40 #SmartManufacturing #IoT', 'predictive maintenance, quality control, yield optimization')
+]
+
+# Additional viral mechanics
+ENGAGEMENT_BOOSTERS = ['📌 Pro tip:', '⚡ Quick win:', '🎯 Key insight:', '💎 Golden rule:', '🔑 Critical factor:', '⚠️ Watch out:', '✨ Breakthrough:', '🚨 Reality check:']
+
+INDUSTRY_CHOICES = [BFSI_INDUSTRY] + OTHER_INDUSTRIES
+
+def post_plan(now=None, choice=None):
+    """Theme, format, industry and booster for the post scheduled at `now`
+
+    `choice` is a (format, industry, booster) index triple overriding the
+    day-of-year rotation.
+    """
+    now = now or datetime.now()
+    day_number = now.timetuple().tm_yday
+    if choice is None:
+        choice = (
+            day_number % len(VIRAL_FORMATS),
+            0 if day_number % 5 < 3 else 1 + day_number % len(OTHER_INDUSTRIES),
+            day_number % len(ENGAGEMENT_BOOSTERS),
+        )
+    post_format = VIRAL_FORMATS[choice[0]]
+    industry_focus, industry_hashtags, pain_points = INDUSTRY_CHOICES[choice[1]]
+    return {
+        'theme': DAY_THEMES.get(now.strftime('%A'), '🚀 Data Science Insights'),
+        'format_type': post_format['type'],
+        'format_hook': post_format['hook'],
+        'format_title_style': post_format['title_style'],
+        'industry_focus': industry_focus,
+        'industry_hashtags': industry_hashtags,
+        'pain_points': pain_points,
+        'booster': ENGAGEMENT_BOOSTERS[choice[2]],
+        'date': now.strftime('%B %d, %Y'),
+        # Filled in by the topic planner when it is enabled
+        'planned_topic': None,
+        'planned_research_source': None,
+        'planned_industry_source': None,
+    }
+
+SYSTEM_PROMPT = "You are an AI/ML professional who shares valuable insights about real research, trends, and developments in the field. You write naturally and conversationally, but you NEVER fabricate personal stories or consulting experiences. You focus on real academic research, industry reports, and documented findings. Your tone is: informative, analytical, curious, and helpful. You present information clearly and help readers understand complex topics. You're knowledgeable but humble, always backing claims with real sources. You write like someone passionate about AI/ML who enjoys sharing interesting discoveries, not like a consultant pitching services or a bot generating content."
+
+# Prompt skeleton: (name, drop priority, full text, compact text). Priority 0
+# sections are always sent; in compact mode the highest priorities are dropped
+# first until the prompt fits PROMPT_TOKEN_BUDGET. A compact text of None drops
+# the section in compact mode, KEEP_SECTION sends the full text. Sections whose
+# placeholders are None in the post plan are left out.
+KEEP_SECTION = object()
+
+PROMPT_SECTIONS = [
+    ('intro', 0,
+     """You are an AI/ML professional sharing REAL insights about trends, research, and developments. Write like a smart, friendly person explaining something clearly to another person.
 
 CRITICAL TONE REQUIREMENTS:
 - Natural, conversational, engaging - like talking to a colleague
@@ -76,15 +526,23 @@ CRITICAL TONE REQUIREMENTS:
 - Thoughtful but human
 - NO robotic or overly formal language
 - NO corporate buzzwords or marketing-style expressions
-- Total post MUST BE UNDER 2800 CHARACTERS
-
-Context:
+- Total post MUST BE UNDER 2800 CHARACTERS""",
+     """You are an AI/ML professional sharing real insights about research and trends. Write like a smart, friendly person talking to a colleague: direct, plain-spoken, short sentences, no corporate buzzwords or marketing speak. Total post MUST BE UNDER 2800 CHARACTERS."""),
+    ('context', 0,
+     """Context:
 - Theme: {theme}
 - Industry: {industry_focus}
+- Format: {format_type} ({format_hook}), title style like "{format_title_style}"
 - Focus: AI, Machine Learning, Deep Learning, Agentic AI, latest developments
-- Date: {datetime.now().strftime('%B %d, %Y')}
-
-BANNED PHRASES (Sound robotic/corporate):
+- Date: {date}""",
+     KEEP_SECTION),
+    ('plan', 0,
+     """HARD REQUIREMENTS FOR THIS POST (picked from the post history, follow exactly):
+- Topic area: {planned_topic}
+- Main sources: {planned_research_source} and {planned_industry_source}. Don't use any other main source.""",
+     KEEP_SECTION),
+    ('banned_phrases', 3,
+     """BANNED PHRASES (Sound robotic/corporate):
 ❌ "In today's fast-paced world..."
 ❌ "It is imperative to note that..."
 ❌ "Leveraging synergies to drive impact..."
@@ -103,9 +561,10 @@ BANNED PHRASES (Sound robotic/corporate):
 ❌ "Ecosystem..."
 ❌ "Disruptive..."
 ❌ Unnecessary semicolons, em dashes, passive voice
-❌ Excessive double quotes around normal words
-
-WRITE LIKE THIS INSTEAD:
+❌ Excessive double quotes around normal words""",
+     """BANNED: "In today's fast-paced world", "It is imperative", "leverage", "synergy", "holistic", "seamless", "paradigm shift", "game-changing", "best-in-class", "going forward", "at the end of the day", "low-hanging fruit", "ecosystem", "disruptive", "utilize". No semicolons, em dashes or passive voice."""),
+    ('write_like_this', 8,
+     """WRITE LIKE THIS INSTEAD:
 ✅ "New research from Stanford shows..." (not "It has been demonstrated that...")
 ✅ "This matters because..." (not "The significance of this cannot be overstated...")
 ✅ "The data is clear..." (not "Data-driven insights reveal that...")
@@ -113,9 +572,10 @@ WRITE LIKE THIS INSTEAD:
 ✅ "Three things changed..." (not "There are three key factors that...")
 ✅ "Most teams struggle with..." (not "Organizations face challenges in...")
 ✅ Active voice: "Researchers found..." (not "It was found by researchers...")
-✅ Short, clear sentences (not long, winding explanations)
-
-TITLE FORMAT:
+✅ Short, clear sentences (not long, winding explanations)""",
+     None),
+    ('title_format', 2,
+     """TITLE FORMAT:
 {theme}: [Clear, interesting title - no corporate speak]
 
 Good titles:
@@ -125,9 +585,10 @@ Good titles:
 
 Bad titles (too corporate):
 - "Leveraging AI Innovation for Digital Transformation"
-- "Optimizing Enterprise ML Performance at Scale"
-
-POST STRUCTURE:
+- "Optimizing Enterprise ML Performance at Scale\"""",
+     """TITLE: {theme}: [Clear, interesting title - no corporate speak]"""),
+    ('structure', 2,
+     """POST STRUCTURE:
 
 **TITLE:**
 {theme}: [Natural, interesting title]
@@ -174,9 +635,16 @@ OR
 
 "Curious what others are seeing - how does this match your experience?"
 
-Keep it simple and genuine.
-
-**RESOURCES (CRITICAL - VARY SOURCES):**
+Keep it simple and genuine.""",
+     """STRUCTURE:
+1. Hook: one interesting, specific finding stated simply.
+2. What's happening: named source, numbers, why it's interesting.
+3. Why it matters: clear explanation and realistic implication.
+4. Real impact: outcomes with numbers from a named source.
+5. "{booster} [Clear insight]" followed by three → recommendations.
+6. One genuine question for readers."""),
+    ('resources', 3,
+     """**RESOURCES (CRITICAL - VARY SOURCES):**
 "📚 Worth reading:
 → [What it covers]: [Source Name] (2024) - [Specific URL]
 → [Why it's useful]: [Different Source] (2024) - [Different URL]"
@@ -203,12 +671,18 @@ Keep it simple and genuine.
 ❌ Stanford + McKinsey (every post)
 ❌ MIT + Gartner (every post)
 ❌ Same 2-3 sources repeatedly
-❌ Generic "research shows" without specific source
-
-**HASHTAGS:**
-#DataScience #MachineLearning {industry_hashtags} #AI #DeepLearning
-
-WRITING PRINCIPLES:
+❌ Generic "research shows" without specific source""",
+     """RESOURCES:
+"📚 Worth reading:
+→ [What it covers]: [Source Name] (2024) - [Specific URL]
+→ [Why it's useful]: [Different Source] (2024) - [Different URL]"
+Mix 1 academic + 1 industry source with specific paper/report names. Never McKinsey or MIT in consecutive posts."""),
+    ('hashtags', 0,
+     """**HASHTAGS:**
+#DataScience #MachineLearning {industry_hashtags} #AI #DeepLearning""",
+     KEEP_SECTION),
+    ('writing_principles', 6,
+     """WRITING PRINCIPLES:
 
 ✅ SHORT SENTENCES: 
 - Break complex ideas into bite-sized pieces
@@ -248,9 +722,10 @@ WRITING PRINCIPLES:
 - Hedging ("somewhat", "relatively", "quite")
 - Corporate speak
 - Marketing fluff
-- Unnecessary complexity
-
-CONTENT FOCUS (VARY TOPICS - Don't repeat patterns):
+- Unnecessary complexity""",
+     """Use "use" not "utilize", "help" not "facilitate", "show" not "demonstrate". Explain technical terms simply. No hedging, nominalizations or fluff."""),
+    ('content_focus', 5,
+     """CONTENT FOCUS (VARY TOPICS - Don't repeat patterns):
 
 **Rotate through these areas:**
 - Model architectures (transformers, diffusion, SSMs, Mamba)
@@ -276,9 +751,10 @@ CONTENT FOCUS (VARY TOPICS - Don't repeat patterns):
 4. Rotate between different sub-fields
 5. Include emerging areas, not just mainstream topics
 6. Cover both advances and practical problems
-7. Address different audience levels (beginners to experts)
-
-SOURCES (Use VARIED, relevant ones - DON'T repeat same sources):
+7. Address different audience levels (beginners to experts)""",
+     """TOPIC: pick one area, don't repeat recent patterns: model architectures, training techniques, agentic AI, MLOps, data quality, real-world applications, benchmarks, safety, open source, research breakthroughs, adoption, cost, RAG and fine-tuning, multimodal, edge ML."""),
+    ('sources', 4,
+     """SOURCES (Use VARIED, relevant ones - DON'T repeat same sources):
 
 **Academic Institutions (Rotate these):**
 - Stanford HAI, MIT CSAIL, Carnegie Mellon, UC Berkeley AI Research
@@ -327,9 +803,10 @@ For {industry_focus}:
 - Financial: Federal Reserve research, BIS papers, IMF reports
 - Healthcare: NEJM, JAMA, WHO reports, FDA publications  
 - Retail: NRF research, eMarketer, Shopify research
-- Manufacturing: Industry Week, McKinsey Operations
-
-DYNAMIC SOURCE SELECTION RULES:
+- Manufacturing: Industry Week, McKinsey Operations""",
+     """SOURCES (vary them): academic (Stanford HAI, CMU, UC Berkeley, MILA, ETH Zurich, Allen AI), labs (DeepMind, Meta FAIR, Microsoft Research, Hugging Face), reports (Gartner, Forrester, Deloitte, State of AI), technical (arXiv papers with titles, Papers with Code, NeurIPS/ICML). For {industry_focus}, add an industry-specific source."""),
+    ('source_rules', 7,
+     """DYNAMIC SOURCE SELECTION RULES:
 1. NEVER use same source 2 posts in a row
 2. Match source to topic (academic for research, industry for adoption trends)
 3. Use specific paper/report names when possible
@@ -345,9 +822,10 @@ Post 2: DeepMind research + arXiv paper
 Post 3: UC Berkeley + Forrester
 Post 4: Hugging Face release + GitHub repo
 Post 5: Meta AI + Nature publication
-Post 6: Carnegie Mellon + Deloitte
-
-TONE CHECKLIST:
+Post 6: Carnegie Mellon + Deloitte""",
+     None),
+    ('tone_checklist', 9,
+     """TONE CHECKLIST:
 □ Sounds like a person talking, not a robot
 □ Direct and clear
 □ Confident but not arrogant
@@ -357,9 +835,10 @@ TONE CHECKLIST:
 □ No marketing speak
 □ Short, readable sentences
 □ Active voice throughout
-□ Natural word choices
-
-LENGTH: 2400-2700 characters
+□ Natural word choices""",
+     None),
+    ('closing', 0,
+     """LENGTH: 2400-2700 characters
 
 You are someone who:
 - Follows AI/ML research closely
@@ -369,23 +848,79 @@ You are someone who:
 - Values substance over style
 - Writes like they speak
 
-Write the complete post now. Make it clear, natural, and genuinely interesting to read."""
+Write the complete post now. Make it clear, natural, and genuinely interesting to read.""",
+     """LENGTH: 2400-2700 characters. Write the complete post now."""),
+]
+
+CompiledPrompt = namedtuple('CompiledPrompt', ['text', 'tokens', 'sections'])
+
+def estimate_tokens(text):
+    """Rough token count: one per word or punctuation mark"""
+    return len(re.findall(r'\w+|[^\w\s]', text))
+
+class PromptCompiler:
+    """Prompt skeleton built once, with the static sections' token counts cached
+
+    Only sections containing {placeholders} are formatted per call.
+    """
     
-    headers = {
-        'Authorization': f'Bearer {GROQ_API_KEY}',
-        'Content-Type': 'application/json'
-    }
+    def __init__(self, sections):
+        self.sections = []
+        for name, priority, full, compact in sections:
+            if compact is KEEP_SECTION:
+                compact = full
+            self.sections.append((name, priority, self._prepare(full), self._prepare(compact)))
+    
+    @staticmethod
+    def _prepare(template):
+        if template is None:
+            return None
+        fields = tuple(field for _, field, _, _ in string.Formatter().parse(template) if field)
+        return template, fields, None if fields else estimate_tokens(template)
     
-    data = {
+    def compile(self, plan, mode='full', budget=None):
+        """Render the prompt for a post plan; compact mode trims it to `budget` tokens"""
+        parts = []
+        for name, priority, full, compact in self.sections:
+            variant = compact if mode == 'compact' else full
+            if variant is None:
+                continue
+            template, fields, tokens = variant
+            if any(plan.get(field) is None for field in fields):
+                continue
+            text = template.format(**plan) if fields else template
+            parts.append((name, priority, text, tokens if tokens is not None else estimate_tokens(text)))
+        
+        if mode == 'compact' and budget:
+            total = sum(part[3] for part in parts)
+            for part in sorted(parts, key=lambda part: -part[1]):
+                if total <= budget or part[1] == 0:
+                    break
+                parts.remove(part)
+                total -= part[3]
+            if total > budget:
+                log.warning(f"⚠️ Compact prompt is ~{total} tokens, over the {budget} token budget")
+        
+        return CompiledPrompt(
+            text='\n\n'.join(part[2] for part in parts),
+            tokens=sum(part[3] for part in parts),
+            sections=[(part[0], part[3]) for part in parts]
+        )
+
+PROMPT_COMPILER = PromptCompiler(PROMPT_SECTIONS)
+
+def completion_request(prompt_text):
+    """Chat-completions request body for a compiled user prompt"""
+    return {
         "model": "llama-3.3-70b-versatile",
         "messages": [
             {
                 "role": "system",
-                "content": "You are an AI/ML professional who shares valuable insights about real research, trends, and developments in the field. You write naturally and conversationally, but you NEVER fabricate personal stories or consulting experiences. You focus on real academic research, industry reports, and documented findings. Your tone is: informative, analytical, curious, and helpful. You present information clearly and help readers understand complex topics. You're knowledgeable but humble, always backing claims with real sources. You write like someone passionate about AI/ML who enjoys sharing interesting discoveries, not like a consultant pitching services or a bot generating content."
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
-                "content": prompt
+                "content": prompt_text
             }
         ],
         "temperature": 0.82,
@@ -394,87 +929,829 @@ Write the complete post now. Make it clear, natural, and genuinely interesting t
         "frequency_penalty": 0.3,
         "presence_penalty": 0.4
     }
+
+def choose_plan(now=None):
+    """post_plan for `now`, with format/industry/booster from the optimizer when
+    enabled and the topic and sources from the topic planner"""
+    if POST_OPTIMIZER == 'bandit':
+        plan = post_plan(now, EngagementOptimizer().choose())
+        log.info(f"Optimizer picked {plan['format_type']} / {plan['industry_focus']} / {plan['booster']}")
+    else:
+        plan = post_plan(now)
+    if TOPIC_PLANNER:
+        plan.update(topic_planner().choose())
+        log.info(f"Planned topic: {plan['planned_topic']} "
+                 f"({plan['planned_research_source']} + {plan['planned_industry_source']})")
+    return plan
+
+PLANNED_FIELDS = ('planned_topic', 'planned_research_source', 'planned_industry_source')
+
+def plan_summary(plan):
+    """The choices of a plan, as stored with drafts, outbox entries and post records"""
+    summary = {'format': plan['format_type'], 'industry': plan['industry_focus'], 'booster': plan['booster']}
+    summary.update({field: plan[field] for field in PLANNED_FIELDS if plan.get(field)})
+    return summary
+
+def generate_post_content(now=None, plan=None, backends=None):
+    """Generate viral LinkedIn post content using advanced engagement strategies
+
+    `now` is the time the post will go out; it picks the day theme and the
+    format/industry rotation, so drafts can be generated ahead of time.
+    Pass a `plan` from choose_plan() to know (and record) what was asked for.
+    `backends` defaults to the configured llm_backends().
+    """
+    backends = backends or llm_backends()
     
-    response = requests.post(
-        'https://api.groq.com/openai/v1/chat/completions',
-        headers=headers,
-        json=data,
-        timeout=30
+    # Verify API keys exist
+    for backend in backends:
+        if not backend.api_key:
+            raise Exception(f"API key for LLM backend {backend.name} is not set or empty")
+        
+        # Debug: Show first/last chars of key (for troubleshooting)
+        key_preview = f"{backend.api_key[:10]}...{backend.api_key[-10:]}" if len(backend.api_key) > 20 else "KEY TOO SHORT"
+        log.info(f"Using {backend.name} API key: {key_preview} ({len(backend.api_key)} characters)")
+    
+    plan = plan or choose_plan(now)
+    prompt = PROMPT_COMPILER.compile(plan, mode=PROMPT_MODE, budget=PROMPT_TOKEN_BUDGET)
+    log.info(f"Prompt: ~{prompt.tokens} tokens ({PROMPT_MODE} mode)")
+    
+    data = completion_request(prompt.text)
+    
+    return _generate_first_valid(data, backends)
+
+class LLMBackend:
+    """An OpenAI-compatible chat-completions endpoint with health tracking
+
+    Recent latencies feed the hedging delay. After LLM_BREAKER_FAILURES
+    consecutive failures the circuit opens and the backend is skipped for
+    LLM_BREAKER_COOLDOWN seconds; the next call after that is a trial; a
+    success closes the circuit and a failure opens it again.
+    """
+    
+    def __init__(self, name, url, model, api_key, timeout=30):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.failures = 0
+        self.open_until = 0.0
+    
+    @property
+    def headers(self):
+        return {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+    
+    def available(self):
+        return time.time() >= self.open_until
+    
+    def hedge_delay(self):
+        """Seconds to wait on this backend before hedging: its recent p95 latency"""
+        with self.lock:
+            if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return LLM_HEDGE_DELAY
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(LLM_HEDGE_PERCENTILE / 100 * len(ordered)))]
+    
+    def record_success(self, seconds):
+        with self.lock:
+            self.latencies = (self.latencies + [round(seconds, 3)])[-50:]
+            self.failures = 0
+            self.open_until = 0.0
+        _save_llm_health(self)
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= LLM_BREAKER_FAILURES:
+                self.open_until = time.time() + LLM_BREAKER_COOLDOWN
+                log.warning(f"⚡ {self.name} failed {self.failures} times in a row, skipping it for {LLM_BREAKER_COOLDOWN:.0f}s")
+                run_metrics().add('llm_circuit_opened')
+        _save_llm_health(self)
+
+_llm_backends = None
+_llm_backends_lock = threading.Lock()
+
+def groq_backends(api_key):
+    """Groq, plus LLM_FALLBACK_MODEL on the same endpoint if set, for one API key"""
+    backends = [LLMBackend('groq', GROQ_API_URL, 'llama-3.3-70b-versatile', api_key)]
+    if LLM_FALLBACK_MODEL:
+        backends.append(LLMBackend(f'groq-{LLM_FALLBACK_MODEL}', GROQ_API_URL, LLM_FALLBACK_MODEL, api_key))
+    return backends
+
+def llm_backends():
+    """Configured backends in preference order, with health restored from LLM_HEALTH_FILE"""
+    global _llm_backends
+    with _llm_backends_lock:
+        if _llm_backends is not None:
+            return _llm_backends
+        if LLM_BACKENDS:
+            backends = [
+                LLMBackend(entry['name'], entry['url'], entry['model'],
+                           os.environ.get(entry['api_key_env'], '') if 'api_key_env' in entry else entry.get('api_key', ''),
+                           entry.get('timeout', 30))
+                for entry in json.loads(LLM_BACKENDS)
+            ]
+        else:
+            backends = groq_backends(GROQ_API_KEY)
+        _llm_backends = restore_llm_health(backends)
+        return backends
+
+def restore_llm_health(backends):
+    """Load latencies and breaker state saved for these backends' names; returns them"""
+    health = _load_llm_health()
+    for backend in backends:
+        saved = health.get(backend.name, {})
+        with backend.lock:
+            backend.latencies = saved.get('latencies', [])
+            backend.failures = saved.get('failures', 0)
+            backend.open_until = saved.get('open_until', 0.0)
+    return backends
+
+def _load_llm_health():
+    try:
+        with open(state_path(LLM_HEALTH_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_llm_health(backend):
+    """Merge one backend's health into LLM_HEALTH_FILE, keeping the other backends' entries
+
+    Works for backends passed to a Poster as well as the configured ones.
+    """
+    with backend.lock:
+        entry = {
+            'latencies': backend.latencies,
+            'failures': backend.failures,
+            'open_until': backend.open_until,
+        }
+    with _file_lock(state_path(LLM_HEALTH_FILE)):
+        health = _load_llm_health()
+        health[backend.name] = entry
+        tmp_path = state_path(LLM_HEALTH_FILE) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(health, f, indent=2)
+        os.replace(tmp_path, state_path(LLM_HEALTH_FILE))
+
+class LLMRequestError(Exception):
+    """A chat-completions endpoint answered with an error status"""
+    
+    def __init__(self, backend, response):
+        super().__init__(f"{backend.name} API error: {response.status_code} - {response.text}")
+        self.status_code = response.status_code
+    
+    @property
+    def backend_fault(self):
+        """Whether the backend is unhealthy, rather than the request being wrong"""
+        return self.status_code >= 500 or self.status_code in (408, 429)
+
+def _timed_completions(backend, data, timeout):
+    """_request_completions with the outcome recorded against the backend's health
+
+    A `timeout` below the backend's own comes from the caller's deadline:
+    the call isn't retried past it, and timing out says nothing about the
+    backend's health.
+    """
+    deadline_bound = timeout < backend.timeout
+    started = time.monotonic()
+    try:
+        result = _request_completions(backend, data, timeout, retries=0 if deadline_bound else None)
+    except LLMRequestError as e:
+        if e.backend_fault:
+            backend.record_failure()
+        raise
+    except requests.Timeout:
+        if not deadline_bound:
+            backend.record_failure()
+        raise
+    except Exception:
+        backend.record_failure()
+        raise
+    backend.record_success(time.monotonic() - started)
+    return result
+
+def _hedged_completion(data, timeout, backends=None):
+    """Ask the first healthy backend, hedging with the next one when it runs slow
+
+    A hedge goes out once the current call has taken longer than that
+    backend's recent p95, or straight away when it fails. The first
+    response with an acceptable candidate wins and the rest are abandoned.
+    Returns (accepted content or None, tokens used).
+    """
+    backends = [backend for backend in backends or llm_backends() if backend.available()]
+    if not backends:
+        raise Exception("All LLM backends are unavailable (circuit breakers open)")
+    
+    deadline = time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=len(backends))
+    pending = {}
+    launched = []
+    errors = []
+    tokens_used = 0
+    
+    def launch(fallback=False):
+        backend = backends[len(launched)]
+        # Never past the caller's deadline
+        call_timeout = min(backend.timeout, deadline - time.monotonic())
+        if call_timeout <= 0:
+            return
+        if fallback:
+            log.info(f"🔀 Falling back to {backend.name}...")
+        elif launched:
+            log.info(f"🔀 {launched[-1].name} is slow, hedging with {backend.name}...")
+            run_metrics().add('llm_hedged_requests')
+        launched.append(backend)
+        pending[_submit(executor, _timed_completions, backend, data, call_timeout)] = backend
+    
+    try:
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            can_hedge = len(launched) < len(backends)
+            wait_for = min(remaining, launched[-1].hedge_delay()) if can_hedge else remaining
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge:
+                    launch()
+                continue
+            
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    contents, used = future.result()
+                except Exception as e:
+                    log.warning(f"⚠️ {backend.name}: {e}")
+                    errors.append(e)
+                    if not pending and len(launched) < len(backends):
+                        launch(fallback=True)
+                    continue
+                tokens_used += used
+                accepted = _select_candidate(contents)
+                if accepted:
+                    run_metrics().add(f'llm_wins_{backend.name}')
+                    return accepted, tokens_used
+    finally:
+        # Don't wait on the slower backend once we have an answer
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if errors and len(errors) == len(launched):
+        raise errors[-1]
+    return None, tokens_used
+
+def _completion_timeout(backend, timeout):
+    """(connect, read) timeouts for a call that must finish within `timeout` seconds"""
+    connect = HTTP_TIMEOUTS.get(urlsplit(backend.url).hostname, HTTP_DEFAULT_TIMEOUT)[0]
+    return min(connect, timeout), timeout
+
+def _request_completions(backend, data, timeout, retries=None):
+    """Single chat-completions call returning (candidate texts, tokens used)"""
+    if GROQ_STREAM:
+        return _stream_completion(backend, data, timeout, retries)
+    
+    response = http_request(
+        'POST',
+        backend.url,
+        headers=backend.headers,
+        json=dict(data, model=backend.model),
+        timeout=_completion_timeout(backend, timeout),
+        retries=retries
     )
     
-    if response.status_code == 200:
-        result = response.json()
-        content = result['choices'][0]['message']['content'].strip()
+    if response.status_code != 200:
+        raise LLMRequestError(backend, response)
+    
+    result = response.json()
+    contents = [choice['message']['content'].strip() for choice in result['choices']]
+    usage = result.get('usage', {})
+    _record_usage(usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+    return contents, usage.get('total_tokens', 0)
+
+def _record_usage(prompt_tokens, completion_tokens):
+    metrics = run_metrics()
+    metrics.add('groq_requests')
+    metrics.add('groq_prompt_tokens', prompt_tokens)
+    metrics.add('groq_completion_tokens', completion_tokens)
+
+def _stream_completion(backend, data, timeout, retries=None):
+    """Stream one completion, hanging up as soon as the draft is unusable
+
+    A draft that runs past the LinkedIn limit is cut off there and left to
+    the usual truncation. A draft containing a banned pattern comes back as
+    no candidates. Tokens are estimated when the stream is abandoned before
+    Groq reports usage.
+    """
+    response = http_request(
+        'POST',
+        backend.url,
+        headers=backend.headers,
+        json=dict(data, model=backend.model, stream=True),
+        timeout=_completion_timeout(backend, timeout),
+        retries=retries,
+        stream=True
+    )
+    if response.status_code != 200:
+        raise LLMRequestError(backend, response)
+    
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in data['messages'])
+    longest_pattern = STYLE_LINTER.reject_window
+    text = ""
+    chunks = 0
+    usage = None
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data: '):
+                continue
+            payload = line[len('data: '):]
+            if payload == '[DONE]':
+                break
+            chunk = json.loads(payload)
+            usage = chunk.get('x_groq', {}).get('usage', usage)
+            delta = chunk['choices'][0]['delta'].get('content') if chunk['choices'] else None
+            if not delta:
+                continue
+            chunks += 1
+            
+            # Only the new text (plus enough overlap for a pattern split across chunks) needs scanning
+            window_start = max(0, len(text) - longest_pattern)
+            text += delta
+            violation = STYLE_LINTER.first_rejection(text[window_start:])
+            if violation:
+                pattern = violation.text
+                log.warning(f"⚠️ Detected banned pattern '{pattern}' after {len(text)} chars, aborting stream...")
+                run_metrics().add('streams_aborted')
+                _record_usage(prompt_tokens, chunks)
+                return [], prompt_tokens + chunks
+            if len(text) > 2950:
+                log.warning(f"⚠️ Draft passed the LinkedIn limit, stopping stream at {len(text)} chars...")
+                break
+    finally:
+        response.close()
+    
+    if usage:
+        _record_usage(usage['prompt_tokens'], usage['completion_tokens'])
+        return [text.strip()], usage['total_tokens']
+    _record_usage(prompt_tokens, chunks)
+    return [text.strip()], prompt_tokens + chunks
+
+def _fit_linkedin_limit(content):
+    """Trim content to LinkedIn's 3000 character limit"""
+    if len(content) > 2950:
+        log.warning(f"⚠️ Content too long ({len(content)} chars), truncating to fit LinkedIn limit...")
+        # Truncate intelligently at last complete sentence before 2900 chars
+        truncated = content[:2900]
+        last_period = truncated.rfind('.')
+        last_newline = truncated.rfind('\n')
+        cut_point = max(last_period, last_newline)
+        if cut_point > 2000:  # Only truncate at sentence if reasonable
+            content = content[:cut_point + 1]
+        else:
+            content = content[:2900] + "..."
+        log.info(f"✂️ Truncated to {len(content)} characters")
+    return content
+
+# Post-processing: Ensure no political/comparison content
+BANNED_PATTERNS = [
+    'trump', 'biden', 'democrat', 'republican', 'liberal', 'conservative',
+    'vs.', ' vs ', 'versus', 'better than', 'worse than', 'compared to'
+]
+
+# Style rules from the prompt's BANNED PHRASES and WRITING PRINCIPLES:
+# (rule, penalty, regex). Matching is case-insensitive; a penalty of None
+# rejects the draft outright. BANNED_PATTERNS keep their plain substring match.
+STYLE_RULES = [
+    ('banned_pattern', None, '|'.join(re.escape(pattern) for pattern in BANNED_PATTERNS)),
+    ('corporate_phrase', 3, r"\b(?:in today's fast-paced world|it is imperative|leverag(?:e|es|ed|ing) synerg\w*|synerg(?:y|ies)"
+                            r"|holistic|seamless(?:ly)?|paradigm shifts?|revolutionary breakthroughs?|game-changing"
+                            r"|best-in-class|moving forward|going forward|at the end of the day|circle back"
+                            r"|low-hanging fruit|ecosystems?|disruptive|cutting-edge)\b"),
+    ('fancy_word', 2, r"\b(?:utiliz(?:e|es|ed|ing|ation)|facilitat(?:e|es|ed|ing)|leverag(?:e|es|ed|ing))\b"),
+    ('semicolon', 1, r";"),
+    ('em_dash', 1, r"\u2014| -- "),
+    ('passive_voice', 1, r"\b(?:is|are|was|were|be|been|being)\s+(?:\w+ly\s+)?"
+                         r"(?:\w+ed|shown|seen|done|made|found|given|taken|known|built|written|driven)\b"),
+]
+
+LintViolation = namedtuple('LintViolation', 'rule penalty start end text')
+LintReport = namedtuple('LintReport', 'violations penalty rejected words sentences avg_sentence_words max_sentence_words reading_ease')
+
+class StyleLinter:
+    """Checks drafts against STYLE_RULES
+
+    The penalty rules are alternatives of a single compiled pattern, so a
+    batch of drafts is scanned once no matter how many rules there are.
+    Rejecting rules get a separate search per draft: in the combined scan
+    an earlier match would swallow a banned phrase inside it. Reports carry
+    the violations, a total penalty and sentence/readability stats.
+
+    >>> [STYLE_LINTER.lint(text).rejected for text in
+    ...  ["Results were compared to the baseline.", "The models were democratized", "This was trumped"]]
+    [True, True, True]
+    """
+    
+    WORD = re.compile(r"[A-Za-z][A-Za-z'-]*|\d[\d,.%$]*")
+    SENTENCE_END = re.compile(r"[.!?]+(?=\s|$)|\n\s*\n")
+    VOWEL_GROUP = re.compile(r"[aeiouy]+")
+    
+    def __init__(self, rules):
+        scored = [rule for rule in rules if rule[1] is not None]
+        self.rules = {f'r{i}': (name, penalty) for i, (name, penalty, _) in enumerate(scored)}
+        self.pattern = re.compile('|'.join(f'(?P<r{i}>{regex})' for i, (_, _, regex) in enumerate(scored)), re.IGNORECASE)
+        self.reject_rule = next(name for name, penalty, _ in rules if penalty is None)
+        rejecting = [f'(?:{regex})' for _, penalty, regex in rules if penalty is None]
+        self.reject_pattern = re.compile('|'.join(rejecting), re.IGNORECASE)
+        # Overlap needed when scanning a growing stream: the longest reject literal
+        self.reject_window = max(len(pattern) for pattern in BANNED_PATTERNS)
+    
+    def first_rejection(self, text):
+        """The first violation that rejects a draft outright, or None"""
+        match = self.reject_pattern.search(text)
+        if not match:
+            return None
+        return LintViolation(self.reject_rule, None, match.start(), match.end(), match.group(0).lower())
+    
+    def lint(self, text):
+        return self.lint_batch([text])[0]
+    
+    def lint_batch(self, texts):
+        """LintReport for every draft, from one penalty scan over the whole batch"""
+        # NUL can't occur in a draft, so no match spans two of them
+        joined = '\0'.join(texts)
+        bounds = []
+        offset = 0
+        for text in texts:
+            bounds.append(offset)
+            offset += len(text) + 1
         
-        # CRITICAL: LinkedIn has 3000 character limit
-        if len(content) > 2950:
-            print(f"⚠️ Content too long ({len(content)} chars), truncating to fit LinkedIn limit...")
-            # Truncate intelligently at last complete sentence before 2900 chars
-            truncated = content[:2900]
-            last_period = truncated.rfind('.')
-            last_newline = truncated.rfind('\n')
-            cut_point = max(last_period, last_newline)
-            if cut_point > 2000:  # Only truncate at sentence if reasonable
-                content = content[:cut_point + 1]
-            else:
-                content = content[:2900] + "..."
-            print(f"✂️ Truncated to {len(content)} characters")
+        violations = [[] for _ in texts]
+        doc = 0
+        for match in self.pattern.finditer(joined):
+            while doc + 1 < len(bounds) and match.start() >= bounds[doc + 1]:
+                doc += 1
+            name, penalty = self.rules[match.lastgroup]
+            start = match.start() - bounds[doc]
+            violations[doc].append(LintViolation(name, penalty, start, start + len(match.group(0)), match.group(0)))
         
-        # Post-processing: Ensure no political/comparison content
-        banned_patterns = [
-            'trump', 'biden', 'democrat', 'republican', 'liberal', 'conservative',
-            'vs.', ' vs ', 'versus', 'better than', 'worse than', 'compared to'
-        ]
+        for text, found in zip(texts, violations):
+            found.extend(LintViolation(self.reject_rule, None, match.start(), match.end(), match.group(0))
+                         for match in self.reject_pattern.finditer(text))
+            found.sort(key=lambda violation: violation.start)
         
-        content_lower = content.lower()
-        for pattern in banned_patterns:
-            if pattern in content_lower:
-                print(f"⚠️ Detected banned pattern '{pattern}', regenerating...")
-                return generate_post_content()
+        return [self._report(text, found) for text, found in zip(texts, violations)]
+    
+    def _report(self, text, violations):
+        sentence_words = []
+        words = syllables = 0
+        start = 0
+        for end in [match.start() for match in self.SENTENCE_END.finditer(text)] + [len(text)]:
+            sentence = self.WORD.findall(text, start, end)
+            if sentence:
+                sentence_words.append(len(sentence))
+                words += len(sentence)
+                syllables += sum(max(1, len(self.VOWEL_GROUP.findall(word.lower()))) for word in sentence)
+                if len(sentence) > LINT_MAX_SENTENCE_WORDS:
+                    violations.append(LintViolation('long_sentence', 1, start, end, f'{len(sentence)} words'))
+            start = end + 1
         
+        sentences = len(sentence_words)
+        # Flesch reading ease: 60-70 is plain English, lower is harder
+        reading_ease = (206.835 - 1.015 * words / sentences - 84.6 * syllables / words) if words else 0.0
+        penalty = sum(violation.penalty or 0 for violation in violations)
+        return LintReport(
+            violations=violations,
+            penalty=penalty,
+            rejected=any(violation.penalty is None for violation in violations) or penalty > LINT_MAX_PENALTY,
+            words=words,
+            sentences=sentences,
+            avg_sentence_words=round(words / sentences, 1) if sentences else 0.0,
+            max_sentence_words=max(sentence_words, default=0),
+            reading_ease=round(reading_ease, 1),
+        )
+
+STYLE_LINTER = StyleLinter(STYLE_RULES)
+
+URL_PATTERN = re.compile(r"https?://[^\s<>()\[\]\"']+")
+DEAD_LINK_STATUSES = {404, 410}
+
+def extract_urls(content):
+    """URLs in a draft, in order, without trailing punctuation"""
+    urls = []
+    for match in URL_PATTERN.finditer(content):
+        url = match.group(0).rstrip('.,;:!?*')
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+def _load_link_cache():
+    try:
+        with open(state_path(LINK_CACHE_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _cached_link(cache, url):
+    """True/False from a fresh cache entry for the URL or its unreachable host, else None"""
+    now = time.time()
+    for key in (url, 'host:' + (urlsplit(url).hostname or '')):
+        entry = cache.get(key)
+        if entry and now - entry['checked_at'] < (LINK_CACHE_TTL if entry['alive'] else LINK_CACHE_DEAD_TTL):
+            return entry['alive']
+    return None
+
+def _host_unreachable(error):
+    """Whether a connection error is a DNS failure or a refused connection
+
+    Resets, TLS errors and the like may be on our side, so they don't
+    condemn the host.
+    """
+    seen = set()
+    pending = [error]
+    while pending:
+        error = pending.pop()
+        if error is None or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, (socket.gaierror, ConnectionRefusedError)):
+            return True
+        if isinstance(error, BaseException):
+            pending += [error.__cause__, error.__context__, getattr(error, 'reason', None)]
+            pending += [arg for arg in error.args if isinstance(arg, BaseException)]
+    return False
+
+def _check_link(url):
+    """(cache key, alive) for one URL, or (url, None) when it can't be decided
+
+    HEAD first; servers that don't do HEAD get a GET whose body is never
+    read. Only 404/410 and hosts that can't be resolved or refuse
+    connections twice in a row count as dead, so bot walls (403), rate
+    limits, 5xx, connection blips, TLS errors and redirect loops leave the
+    link unverified.
+    """
+    for attempt in range(2):
+        try:
+            response = http_request('HEAD', url, timeout=LINK_CHECK_TIMEOUT, retries=0, allow_redirects=True)
+            if response.status_code >= 400 and response.status_code not in DEAD_LINK_STATUSES:
+                response = http_request('GET', url, timeout=LINK_CHECK_TIMEOUT, retries=0, allow_redirects=True, stream=True)
+                response.close()
+            break
+        except requests.Timeout:
+            return url, None
+        except requests.ConnectionError as e:
+            if not _host_unreachable(e):
+                return url, None
+            if attempt:
+                return 'host:' + (urlsplit(url).hostname or ''), False
+            time.sleep(_backoff(0))
+        except requests.RequestException:
+            return url, None  # redirect loops, invalid URLs and the like say nothing about the page
+    if response.status_code in DEAD_LINK_STATUSES:
+        return url, False
+    if response.status_code < 400:
+        return url, True
+    return url, None
+
+def check_links(urls, cached_only=False):
+    """{url: True (alive), False (dead) or None (unverified)} within LINK_CHECK_BUDGET
+
+    Fresh results come from LINK_CACHE_FILE; the rest are checked
+    concurrently, unless `cached_only`. Links still running when the
+    budget runs out are unverified.
+    """
+    cache = _load_link_cache()
+    results = {url: _cached_link(cache, url) for url in urls}
+    pending = [url for url, alive in results.items() if alive is None]
+    run_metrics().add('links_cached', len(urls) - len(pending))
+    if not pending or cached_only:
+        return results
+    
+    executor = ThreadPoolExecutor(max_workers=min(LINK_CHECK_CONCURRENCY, len(pending)))
+    futures = {_submit(executor, _check_link, url): url for url in pending}
+    done, _ = wait(futures, timeout=LINK_CHECK_BUDGET)
+    executor.shutdown(wait=False, cancel_futures=True)
+    run_metrics().add('links_checked', len(done))
+    
+    checked = {}
+    for future in done:
+        url = futures[future]
+        key, alive = future.result()
+        results[url] = alive
+        if alive is not None:
+            checked[key] = {'alive': alive, 'checked_at': time.time()}
+    if checked:
+        with _file_lock(state_path(LINK_CACHE_FILE)):
+            cache = _load_link_cache()
+            cache.update(checked)
+            tmp_path = state_path(LINK_CACHE_FILE) + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp_path, state_path(LINK_CACHE_FILE))
+    return results
+
+def verify_links(content, cached_only=False):
+    """The draft with dead links handled per LINK_POLICY, or None to reject it
+
+    Repairing drops every line that cites a dead link, and the
+    "Worth reading" heading too if nothing is left under it. With
+    `cached_only` no request is made; links without a fresh cached result
+    are kept.
+    """
+    urls = extract_urls(content)
+    if not LINK_CHECK or not urls:
         return content
-    else:
-        raise Exception(f"Groq API error: {response.status_code} - {response.text}")
+    results = check_links(urls, cached_only=cached_only)
+    dead = [url for url, alive in results.items() if alive is False]
+    unverified = sum(1 for alive in results.values() if alive is None)
+    if unverified and not cached_only:
+        log.info(f"🔗 {unverified} link(s) could not be verified in time, keeping them")
+    if not dead:
+        return content
+    
+    log.info(f"🔗 Dead link(s): {', '.join(dead)}")
+    run_metrics().add('links_dead', len(dead))
+    if LINK_POLICY == 'reject':
+        return None
+    
+    lines = [line for line in content.split('\n') if not any(url in line for url in dead)]
+    for i, line in enumerate(lines):
+        if 'Worth reading' in line:
+            following = next((other for other in lines[i + 1:] if other.strip()), '')
+            if not following.lstrip().startswith('→'):
+                del lines[i]
+            break
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+def _select_candidate(contents):
+    """The best candidate from one response, fitted to LinkedIn's limit, or None
 
-def get_person_urn():
-    """Get LinkedIn person URN (user ID) - tries multiple methods"""
+    Candidates are linted as a batch and tried lowest penalty first; the
+    first that passes the style, duplicate and link checks wins.
+    """
+    candidates = [_fit_linkedin_limit(content) for content in contents]
+    reports = STYLE_LINTER.lint_batch(candidates)
+    for report, content in sorted(zip(reports, candidates), key=lambda pair: pair[0].penalty):
+        if report.rejected:
+            banned = [violation.text for violation in report.violations if violation.penalty is None]
+            if banned:
+                log.warning(f"⚠️ Detected banned pattern '{banned[0].lower()}', discarding candidate...")
+            else:
+                rules = sorted({violation.rule for violation in report.violations})
+                log.warning(f"⚠️ Style penalty {report.penalty} over {LINT_MAX_PENALTY} ({', '.join(rules)}), discarding candidate...")
+            run_metrics().add('candidates_rejected')
+            continue
+        duplicate = duplicate_index().query(content)
+        if duplicate:
+            key, similarity = duplicate
+            log.warning(f"⚠️ Draft is {similarity:.0%} similar to the post from {key}")
+            if DUPLICATE_POLICY == 'reject':
+                log.info("Discarding candidate...")
+                run_metrics().add('candidates_rejected')
+                continue
+        content = verify_links(content)
+        if content is None:
+            log.info("Discarding candidate with dead links...")
+            run_metrics().add('candidates_rejected')
+            continue
+        log.info(f"Style: penalty {report.penalty}, {report.avg_sentence_words} words/sentence, "
+                 f"reading ease {report.reading_ease}")
+        return content
+    return None
+
+def _generate_first_valid(data, backends=None):
+    """Request candidates in rounds and return the first one that passes the filters
+
+    Each round asks for GENERATION_CANDIDATES drafts at once as concurrent
+    requests (Groq only accepts n=1), each hedged across the LLM backends. Rounds stop at the attempt, token or
+    wall-clock budget, whichever comes first.
+    """
+    started = time.monotonic()
+    deadline = started + GENERATION_TIME_BUDGET
+    attempts = 0
+    tokens_used = 0
+    
+    while attempts < GENERATION_MAX_ATTEMPTS and tokens_used < GENERATION_TOKEN_BUDGET:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        
+        batch = min(GENERATION_CANDIDATES, GENERATION_MAX_ATTEMPTS - attempts)
+        attempts += batch
+        run_metrics().add('generation_attempts', batch)
+        log.info(f"Requesting {batch} candidate(s) (attempts {attempts}/{GENERATION_MAX_ATTEMPTS})...")
+        
+        executor = ThreadPoolExecutor(max_workers=batch)
+        futures = [_submit(executor, _hedged_completion, data, remaining, backends) for _ in range(batch)]
+        errors = []
+        try:
+            for future in as_completed(futures, timeout=remaining):
+                try:
+                    content, used = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                tokens_used += used
+                if content:
+                    return content
+        except FuturesTimeoutError:
+            break
+        finally:
+            # Don't wait on slower candidates once we have an answer
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Nothing came back at all: the API itself is failing, don't keep paying for it
+        if len(errors) == len(futures):
+            raise errors[-1]
+    
+    raise Exception(
+        f"No acceptable post after {attempts} attempts "
+        f"({tokens_used} tokens, {time.monotonic() - started:.1f}s)"
+    )
+
+def get_person_urn(access_token=None):
+    """Get LinkedIn person URN (user ID) - races /v2/userinfo and /v2/me"""
     headers = {
-        'Authorization': f'Bearer {LINKEDIN_ACCESS_TOKEN}',
+        'Authorization': f'Bearer {access_token or LINKEDIN_ACCESS_TOKEN}',
         'Content-Type': 'application/json'
     }
     
-    # Try method 1: OpenID Connect
+    def fetch(path, field):
+        response = http_request('GET', f'{LINKEDIN_API_BASE}{path}', headers=headers, retries=1)
+        if response.status_code != 200:
+            raise Exception(f"{path} returned {response.status_code}")
+        value = response.json().get(field)
+        if not value:
+            raise Exception(f"{path} returned no '{field}'")
+        return value
+    
+    # OpenID Connect and the legacy /me endpoint; whichever answers first wins
+    executor = ThreadPoolExecutor(max_workers=2)
+    futures = [
+        _submit(executor, fetch, '/v2/userinfo', 'sub'),
+        _submit(executor, fetch, '/v2/me', 'id'),
+    ]
+    errors = []
     try:
-        response = requests.get('https://api.linkedin.com/v2/userinfo', headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json().get('sub')
-    except:
-        pass
+        for future in as_completed(futures):
+            try:
+                return future.result()
+            except Exception as e:
+                errors.append(str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
     
-    # Try method 2: Legacy /me endpoint
+    raise Exception(f"Failed to get Person URN from LinkedIn API ({'; '.join(errors)})")
+
+def _urn_cache_key(access_token):
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+def _load_urn_cache():
     try:
-        response = requests.get('https://api.linkedin.com/v2/me', headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json().get('id')
-    except:
-        pass
+        with open(state_path(URN_CACHE_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def resolve_person_urn(access_token=None):
+    """Person URN of `access_token` from the on-disk cache or the LinkedIn API
+
+    Without a token it is the environment's account, and LINKEDIN_PERSON_URN
+    is used when set.
+    """
+    if not access_token:
+        if LINKEDIN_PERSON_URN:
+            return LINKEDIN_PERSON_URN
+        access_token = LINKEDIN_ACCESS_TOKEN
+    
+    key = _urn_cache_key(access_token or '')
+    entry = _load_urn_cache().get(key)
+    if entry and time.time() - entry['resolved_at'] < URN_CACHE_TTL:
+        return entry['urn']
     
-    raise Exception("Failed to get Person URN from LinkedIn API")
+    log.info("Person URN not provided, fetching automatically...")
+    person_urn = get_person_urn(access_token)
+    log.info(f"Fetched Person URN: {person_urn}")
+    
+    with _file_lock(state_path(URN_CACHE_FILE)):
+        cache = _load_urn_cache()
+        cache[key] = {'urn': person_urn, 'resolved_at': time.time()}
+        tmp_path = state_path(URN_CACHE_FILE) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, state_path(URN_CACHE_FILE))
+    return person_urn
 
-def post_to_linkedin(content):
-    """Post content to LinkedIn"""
-    headers = {
-        'Authorization': f'Bearer {LINKEDIN_ACCESS_TOKEN}',
-        'Content-Type': 'application/json',
-        'X-Restli-Protocol-Version': '2.0.0'
-    }
+def post_to_linkedin(content, person_urn=None, access_token=None, media=None):
+    """Post content to LinkedIn, with media from upload_media() if given"""
+    headers = _linkedin_headers(access_token)
     
-    # Get person URN - either from env var or fetch it
-    person_urn = LINKEDIN_PERSON_URN
-    if not person_urn or person_urn == "":
-        print("Person URN not provided, fetching automatically...")
-        person_urn = get_person_urn()
-        print(f"Fetched Person URN: {person_urn}")
+    # Get person URN - prefetched by the caller, or from env var / cache / API
+    if not person_urn:
+        person_urn = resolve_person_urn(access_token)
     
     post_data = {
         "author": f"urn:li:person:{person_urn}",
@@ -484,66 +1761,2111 @@ def post_to_linkedin(content):
                 "shareCommentary": {
                     "text": content
                 },
-                "shareMediaCategory": "NONE"
+                "shareMediaCategory": media[0]['category'] if media else "NONE"
             }
         },
         "visibility": {
             "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
         }
     }
+    if media:
+        post_data['specificContent']['com.linkedin.ugc.ShareContent']['media'] = [
+            {"status": "READY", "media": item['asset'], "title": {"text": item['title']}}
+            for item in media
+        ]
     
-    response = requests.post(
-        'https://api.linkedin.com/v2/ugcPosts',
+    response = http_request(
+        'POST',
+        f'{LINKEDIN_API_BASE}/v2/ugcPosts',
         headers=headers,
-        json=post_data
+        json=post_data,
+        idempotent=False
     )
     
     return response
 
-def save_post_record(content, status):
+# File extension -> (ugcPosts media category, upload recipe)
+MEDIA_TYPES = {
+    '.jpg': ('IMAGE', 'urn:li:digitalmediaRecipe:feedshare-image'),
+    '.jpeg': ('IMAGE', 'urn:li:digitalmediaRecipe:feedshare-image'),
+    '.png': ('IMAGE', 'urn:li:digitalmediaRecipe:feedshare-image'),
+    '.gif': ('IMAGE', 'urn:li:digitalmediaRecipe:feedshare-image'),
+    '.pdf': ('NATIVE_DOCUMENT', 'urn:li:digitalmediaRecipe:feedshare-document'),
+    '.ppt': ('NATIVE_DOCUMENT', 'urn:li:digitalmediaRecipe:feedshare-document'),
+    '.pptx': ('NATIVE_DOCUMENT', 'urn:li:digitalmediaRecipe:feedshare-document'),
+    '.doc': ('NATIVE_DOCUMENT', 'urn:li:digitalmediaRecipe:feedshare-document'),
+    '.docx': ('NATIVE_DOCUMENT', 'urn:li:digitalmediaRecipe:feedshare-document'),
+}
+MULTIPART_MECHANISM = 'com.linkedin.digitalmedia.uploading.MultipartUpload'
+SINGLE_UPLOAD_MECHANISM = 'com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest'
+
+class MemoryBudget:
+    """Counting semaphore over bytes, shared by every upload in the process"""
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.available = capacity
+        self.condition = threading.Condition()
+    
+    def acquire(self, size):
+        size = min(size, self.capacity)
+        with self.condition:
+            while self.available < size:
+                self.condition.wait()
+            self.available -= size
+        return size
+    
+    def release(self, size):
+        with self.condition:
+            self.available += size
+            self.condition.notify_all()
+
+_media_budget = MemoryBudget(MEDIA_MEMORY_CEILING)
+
+class MappedRange:
+    """Request body streaming bytes [start, end) of a file through mmap
+
+    Each pass maps the file afresh, so retries can resend the body. At most
+    one chunk per body is held outside the page cache, and it is counted
+    against the shared memory budget until the socket has taken it.
+    """
+    
+    def __init__(self, path, start, end, budget=None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.budget = budget or _media_budget
+    
+    def __len__(self):
+        return self.end - self.start
+    
+    def __iter__(self):
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            offset = self.start
+            while offset < self.end:
+                # The budget may grant less than a chunk; send what was granted
+                size = self.budget.acquire(min(MEDIA_CHUNK_SIZE, self.end - offset))
+                try:
+                    yield mapped[offset:offset + size]
+                finally:
+                    self.budget.release(size)
+                offset += size
+
+def _linkedin_headers(access_token=None):
+    return {
+        'Authorization': f'Bearer {access_token or LINKEDIN_ACCESS_TOKEN}',
+        'Content-Type': 'application/json',
+        'X-Restli-Protocol-Version': '2.0.0'
+    }
+
+def _upload_state_path(path):
+    return path + '.upload.json'
+
+def _load_upload_state(path):
+    """Registration and finished parts from an earlier attempt at this exact file"""
+    stat = os.stat(path)
+    try:
+        with open(_upload_state_path(path), 'r') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if (state.get('size'), state.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    if time.time() - state.get('registered_at', 0) > MEDIA_RESUME_TTL:
+        return None
+    return state
+
+def _save_upload_state(path, state):
+    tmp_path = _upload_state_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, _upload_state_path(path))
+
+def _register_upload(path, recipe, person_urn, access_token=None):
+    size = os.path.getsize(path)
+    request = {
+        "registerUploadRequest": {
+            "recipes": [recipe],
+            "owner": f"urn:li:person:{person_urn}",
+            "serviceRelationships": [
+                {"relationshipType": "OWNER", "identifier": "urn:li:userGeneratedContent"}
+            ],
+        }
+    }
+    if size >= MEDIA_MULTIPART_THRESHOLD:
+        request['registerUploadRequest']['supportedUploadMechanism'] = ['MULTIPART_UPLOAD']
+        request['registerUploadRequest']['fileSize'] = size
+    
+    # An abandoned registration costs nothing, so this POST may be retried
+    response = http_request(
+        'POST',
+        f'{LINKEDIN_API_BASE}/v2/assets?action=registerUpload',
+        headers=_linkedin_headers(access_token),
+        json=request
+    )
+    if response.status_code != 200:
+        raise Exception(f"Failed to register upload for {path}: {response.status_code} - {response.text}")
+    return response.json()['value']
+
+def _upload_part(path, part, access_token=None):
+    """PUT one byte range; returns the part's ETag"""
+    headers = dict(part.get('headers') or {})
+    headers.setdefault('Authorization', f'Bearer {access_token or LINKEDIN_ACCESS_TOKEN}')
+    headers.setdefault('Content-Type', 'application/octet-stream')
+    body = MappedRange(path, part['byteRange']['firstByte'], part['byteRange']['lastByte'] + 1)
+    response = http_request('PUT', part['url'], timeout=MEDIA_UPLOAD_TIMEOUT, headers=headers, data=body)
+    if response.status_code not in (200, 201):
+        raise Exception(f"Upload of {os.path.basename(path)} bytes "
+                        f"{body.start}-{body.end - 1} failed: {response.status_code} - {response.text}")
+    run_metrics().add('media_bytes_uploaded', len(body))
+    return response.headers.get('ETag', '')
+
+def _upload_file(path, person_urn, executor, access_token=None):
+    """Upload one file, resuming a multipart upload left unfinished by an earlier run"""
+    state = _load_upload_state(path)
+    if state and state.get('complete'):
+        log.info(f"📎 {os.path.basename(path)} already uploaded as {state['asset']}")
+        return state['asset']
+    
+    if state is None:
+        _, recipe = MEDIA_TYPES[os.path.splitext(path)[1].lower()]
+        value = _register_upload(path, recipe, person_urn, access_token)
+        stat = os.stat(path)
+        state = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'registered_at': time.time(),
+            'asset': value['asset'],
+            'media_artifact': value.get('mediaArtifact'),
+            'mechanism': value['uploadMechanism'],
+            'etags': {},
+        }
+        _save_upload_state(path, state)
+    
+    mechanism = state['mechanism']
+    if MULTIPART_MECHANISM in mechanism:
+        parts = mechanism[MULTIPART_MECHANISM]['partUploadRequests']
+    else:
+        single = mechanism[SINGLE_UPLOAD_MECHANISM]
+        parts = [{
+            'url': single['uploadUrl'],
+            'headers': single.get('headers'),
+            'byteRange': {'firstByte': 0, 'lastByte': state['size'] - 1},
+        }]
+    
+    pending = {str(i): part for i, part in enumerate(parts) if str(i) not in state['etags']}
+    if len(pending) < len(parts):
+        log.info(f"📎 Resuming {os.path.basename(path)}: {len(parts) - len(pending)}/{len(parts)} parts already uploaded")
+    futures = {_submit(executor, _upload_part, path, part, access_token): i for i, part in pending.items()}
+    errors = []
+    for future in as_completed(futures):
+        try:
+            etag = future.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        # Record each part as it lands so a failed run resumes from here
+        state['etags'][futures[future]] = etag
+        _save_upload_state(path, state)
+    if errors:
+        raise errors[0]
+    
+    if MULTIPART_MECHANISM in mechanism:
+        response = http_request(
+            'POST',
+            f'{LINKEDIN_API_BASE}/v2/assets?action=completeMultiPartUpload',
+            headers=_linkedin_headers(access_token),
+            json={
+                "completeMultipartUploadRequest": {
+                    "mediaArtifact": state['media_artifact'],
+                    "metadata": mechanism[MULTIPART_MECHANISM].get('metadata'),
+                    "partUploadResponses": [
+                        {"httpStatusCode": 200, "headers": {"ETag": state['etags'][str(i)]}}
+                        for i in range(len(parts))
+                    ],
+                }
+            }
+        )
+        if response.status_code not in (200, 201):
+            raise Exception(f"Failed to complete upload of {path}: {response.status_code} - {response.text}")
+    
+    state['complete'] = True
+    _save_upload_state(path, state)
+    log.info(f"📎 Uploaded {os.path.basename(path)} ({state['size']} bytes) as {state['asset']}")
+    return state['asset']
+
+def upload_media(paths, person_urn=None, access_token=None):
+    """Upload media files concurrently; returns the `media` list for post_to_linkedin
+
+    Images can be combined in one post; a document must be posted alone.
+    Parts of every file share MEDIA_CONCURRENCY upload threads and the
+    MEDIA_MEMORY_CEILING byte budget.
+    """
+    categories = set()
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in MEDIA_TYPES:
+            raise Exception(f"Unsupported media type: {path}")
+        if os.path.getsize(path) == 0:
+            raise Exception(f"Media file is empty: {path}")
+        categories.add(MEDIA_TYPES[extension][0])
+    if len(categories) > 1 or ('NATIVE_DOCUMENT' in categories and len(paths) > 1):
+        raise Exception("A post can carry several images or a single document, not a mix")
+    
+    if not person_urn:
+        person_urn = resolve_person_urn(access_token)
+    
+    with ThreadPoolExecutor(max_workers=MEDIA_CONCURRENCY) as part_executor, \
+            ThreadPoolExecutor(max_workers=len(paths)) as file_executor:
+        futures = [
+            _submit(file_executor, _upload_file, path, person_urn, part_executor, access_token)
+            for path in paths
+        ]
+        assets = [future.result() for future in futures]
+    
+    return [
+        {'asset': asset, 'path': path, 'category': MEDIA_TYPES[os.path.splitext(path)[1].lower()][0],
+         'title': os.path.splitext(os.path.basename(path))[0]}
+        for path, asset in zip(paths, assets)
+    ]
+
+def forget_media_uploads(media):
+    """Drop upload state once the post carrying the media is live"""
+    for item in media or []:
+        try:
+            os.remove(_upload_state_path(item['path']))
+        except FileNotFoundError:
+            pass
+
+def _file_lock(path):
+    """Exclusive advisory lock on `path`, held until the returned file is closed"""
+    lock = open(path + '.lock', 'a')
+    if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+def _history_lock():
+    """Exclusive lock shared by every writer of the post history"""
+    return _file_lock(state_path(HISTORY_FILE))
+
+def history_path(timestamp=None):
+    """History file a record with this ISO timestamp belongs to"""
+    history_file = state_path(HISTORY_FILE)
+    if HISTORY_SHARDING != 'monthly':
+        return history_file
+    stem, ext = os.path.splitext(history_file)
+    month = (timestamp or datetime.now().isoformat())[:7]
+    return f"{stem}-{month}{ext}"
+
+def history_files():
+    """All JSON-lines history files, oldest shard first"""
+    history_file = state_path(HISTORY_FILE)
+    stem, ext = os.path.splitext(history_file)
+    files = sorted(glob.glob(f"{glob.escape(stem)}-[0-9][0-9][0-9][0-9]-[0-9][0-9]{ext}"))
+    if os.path.exists(history_file):
+        files.insert(0, history_file)
+    return files
+
+def _legacy_history_files():
+    """[the legacy posts.json] until it has been migrated, else []"""
+    legacy_file = state_path(LEGACY_HISTORY_FILE)
+    return [legacy_file] if os.path.exists(legacy_file) else []
+
+def _read_jsonl(path):
+    """Yield records from a JSON-lines file, skipping a torn trailing line"""
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                log.warning(f"⚠️ Skipping unreadable history line in {path}")
+
+def iter_post_records():
+    """Yield every post record in the order it was written"""
+    for legacy_file in _legacy_history_files():
+        for _, _, record in iter_json_array(legacy_file):
+            yield record
+    for path in history_files():
+        yield from _read_jsonl(path)
+
+def _fsync_dir(path):
+    """Make a rename in this directory durable"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def migrate_legacy_history():
+    """One-time move of the legacy posts.json array into JSON-lines history
+
+    Safe to re-run after a crash: records already present in a shard are
+    not written twice, and posts.json is only retired once every shard has
+    been replaced on disk.
+    """
+    legacy_file = state_path(LEGACY_HISTORY_FILE)
+    if not os.path.exists(legacy_file):
+        return 0
+    with _history_lock():
+        if not os.path.exists(legacy_file):
+            return 0
+        with open(legacy_file, 'r') as f:
+            legacy = json.load(f)
+
+        shards = {}
+        for record in legacy:
+            shards.setdefault(history_path(record.get('timestamp')), []).append(record)
+
+        for path, records in shards.items():
+            existing = list(_read_jsonl(path)) if os.path.exists(path) else []
+            seen = {(r.get('timestamp'), r.get('content')) for r in existing}
+            records = [r for r in records if (r.get('timestamp'), r.get('content')) not in seen]
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for record in records + existing:
+                    f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+        os.replace(legacy_file, legacy_file + '.migrated')
+        _fsync_dir(state_path(HISTORY_FILE))
+    log.info(f"📦 Migrated {len(legacy)} records from {legacy_file} to JSON-lines history")
+    return len(legacy)
+
+def save_post_record(content, status, **fields):
     """Save posted content to track history"""
     record = {
         'timestamp': datetime.now().isoformat(),
         'content': content,
         'status': status
     }
+    record.update(fields)
+    
+    migrate_legacy_history()
+    
+    # Append one line; cost does not depend on how much history exists
+    path = history_path(record['timestamp'])
+    line = json.dumps(record) + '\n'
+    with _history_lock():
+        with open(path, 'a+b') as f:
+            # Finish a line torn by an earlier crash so this record stays readable
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    line = '\n' + line
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    if content and status == 'success':
+        duplicate_index().add(record['timestamp'], content)
+
+class MinHashIndex:
+    """Persisted MinHash/LSH index of published post contents
+
+    Signatures use one-permutation hashing over word 3-gram shingles, so
+    building one costs a single hash per shingle. Lookups only touch the
+    LSH buckets a draft falls into, never the whole history.
+    """
+    
+    NUM_PERM = 60
+    BANDS = 20
+    SHINGLE_SIZE = 3
+    
+    def __init__(self, path=None):
+        self.path = path or state_path(DUPLICATE_INDEX_FILE)
+        self.rows = self.NUM_PERM // self.BANDS
+        self.params = {'num_perm': self.NUM_PERM, 'bands': self.BANDS, 'shingle_size': self.SHINGLE_SIZE}
+        self.lock = threading.Lock()
+        self.signatures = {}
+        self.buckets = [{} for _ in range(self.BANDS)]
+        self._load()
+    
+    def signature(self, text):
+        """One-permutation MinHash signature of text"""
+        words = re.findall(r'\w+', text.lower())
+        k = self.SHINGLE_SIZE
+        sig = [None] * self.NUM_PERM
+        for i in range(max(1, len(words) - k + 1)):
+            shingle = ' '.join(words[i:i + k]).encode('utf-8')
+            h = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'big')
+            slot, value = h % self.NUM_PERM, h >> 8
+            if sig[slot] is None or value < sig[slot]:
+                sig[slot] = value
+        # Densify: an empty slot borrows the nearest filled slot to its right
+        filled = [i for i, v in enumerate(sig) if v is not None]
+        if not filled:
+            return tuple([0] * self.NUM_PERM)
+        for i, v in enumerate(sig):
+            if v is None:
+                source = next((j for j in filled if j > i), filled[0])
+                sig[i] = sig[source] + (source - i) % self.NUM_PERM
+        return tuple(sig)
+    
+    def _bands(self, sig):
+        for b in range(self.BANDS):
+            yield b, sig[b * self.rows:(b + 1) * self.rows]
+    
+    def _insert(self, key, sig):
+        """Index a signature; False if the key is already indexed"""
+        with self.lock:
+            if key in self.signatures:
+                return False
+            self.signatures[key] = sig
+            for b, band in self._bands(sig):
+                self.buckets[b].setdefault(band, []).append(key)
+            return True
+    
+    def remove(self, key):
+        """Forget an in-memory entry (entries on disk are permanent)"""
+        with self.lock:
+            sig = self.signatures.pop(key, None)
+            if sig is None:
+                return
+            for b, band in self._bands(sig):
+                keys = self.buckets[b].get(band, [])
+                if key in keys:
+                    keys.remove(key)
+    
+    def query(self, text, threshold=DUPLICATE_THRESHOLD):
+        """Return (key, estimated similarity) of the closest earlier post above threshold"""
+        sig = self.signature(text)
+        with self.lock:
+            candidates = {key: self.signatures[key] for b, band in self._bands(sig) for key in self.buckets[b].get(band, ())}
+        best = None
+        for key, other in candidates.items():
+            similarity = sum(a == b for a, b in zip(sig, other)) / self.NUM_PERM
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+    
+    def add(self, key, text, persist=True):
+        """Index one post and append its signature to disk unless persist is False
+
+        A key that is already indexed (e.g. read by the rebuild that loaded
+        the index) is left alone.
+        """
+        sig = self.signature(text)
+        if not self._insert(key, sig) or not persist:
+            return
+        with _history_lock():
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'key': key, 'sig': sig}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                header = f.readline()
+            try:
+                if json.loads(header) == self.params:
+                    for entry in _read_jsonl(self.path):
+                        if 'sig' in entry:
+                            self._insert(entry['key'], tuple(entry['sig']))
+                    return
+            except json.JSONDecodeError:
+                pass
+            log.warning("⚠️ Duplicate index is stale or unreadable, rebuilding...")
+        self.rebuild()
+    
+    def rebuild(self):
+        """Rebuild the index from the full post history"""
+        self.signatures = {}
+        self.buckets = [{} for _ in range(self.BANDS)]
+        for record in iter_post_records():
+            if record.get('content') and record.get('status') == 'success':
+                self._insert(record['timestamp'], self.signature(record['content']))
+        tmp_path = self.path + '.tmp'
+        with _history_lock():
+            with open(tmp_path, 'w') as f:
+                f.write(json.dumps(self.params) + '\n')
+                for key, sig in self.signatures.items():
+                    f.write(json.dumps({'key': key, 'sig': sig}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+_duplicate_indexes = {}
+_duplicate_index_lock = threading.Lock()
+
+def duplicate_index():
+    """Process-wide duplicate index of the current history, loaded on first use"""
+    path = state_path(DUPLICATE_INDEX_FILE)
+    with _duplicate_index_lock:
+        if path not in _duplicate_indexes:
+            _duplicate_indexes[path] = MinHashIndex(path)
+        return _duplicate_indexes[path]
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """Incrementally parse a JSON array file, yielding (start byte, end byte, item)
+
+    Only one item plus one read chunk is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    buffer_offset = 0  # byte offset of buffer[0] in the file
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += utf8.decode(chunk, final=not chunk)
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,[':
+                    pos += 1
+                if pos >= len(buffer) or buffer[pos] == ']':
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # item continues in the next chunk
+                start_byte = buffer_offset + len(buffer[:pos].encode('utf-8'))
+                end_byte = start_byte + len(buffer[pos:end].encode('utf-8'))
+                yield start_byte, end_byte, item
+                pos = end
+            buffer_offset += len(buffer[:pos].encode('utf-8'))
+            buffer = buffer[pos:]
+            if not chunk or buffer.startswith(']'):
+                return
+
+def iter_jsonl(path, start=0):
+    """Yield (start byte, end byte, record) for complete lines of a JSON-lines file"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            end = offset + len(line)
+            if not line.endswith(b'\n'):
+                return  # torn final line, not indexed until it is finished
+            if line.strip():
+                try:
+                    yield offset, end, json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+            offset = end
+
+class HistoryIndex:
+    """Columnar sidecar index over one history file
+
+    `<file>.idx` holds fixed-size rows of (timestamp, status id, content
+    length, byte offset of the record). `<file>.idx.json` holds the status
+    table, running aggregates, and how far the source has been indexed.
+    JSON-lines files are indexed incrementally from that point; anything
+    else is re-indexed when it changes.
+    """
+    
+    ROW = struct.Struct('<dHIQ')
+    
+    def __init__(self, path):
+        self.path = path
+        self.idx_path = path + '.idx'
+        self.meta_path = path + '.idx.json'
+        self.meta = None
+    
+    def _head_hash(self):
+        with open(self.path, 'rb') as f:
+            return hashlib.sha256(f.read(4096)).hexdigest()
+    
+    def update(self):
+        """Bring the index up to date with the source file; returns rows added"""
+        size = os.path.getsize(self.path)
+        head_hash = self._head_hash()
+        appendable = self.path.endswith('.jsonl')
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = None
+        
+        fresh = (
+            meta is not None
+            and meta['indexed_bytes'] <= size
+            and (meta['head_hash'] == head_hash or meta['indexed_bytes'] < 4096)
+            and (appendable or meta['indexed_bytes'] == size)
+        )
+        if fresh and meta['indexed_bytes'] == size:
+            self.meta = meta
+            return 0
+        if not fresh:
+            meta = {
+                'indexed_bytes': 0, 'rows': 0, 'head_hash': head_hash, 'statuses': [],
+                'status_counts': [], 'content_chars': 0, 'content_posts': 0,
+                'first': None, 'last': None, 'success_weeks': {},
+            }
+        
+        status_ids = {status: i for i, status in enumerate(meta['statuses'])}
+        records = iter_jsonl(self.path, meta['indexed_bytes']) if appendable else iter_json_array(self.path)
+        added = 0
+        with open(self.idx_path, 'r+b' if fresh and os.path.exists(self.idx_path) else 'wb') as idx:
+            # Drop rows written after the last meta update (crash between the two writes)
+            idx.truncate(meta['rows'] * self.ROW.size)
+            idx.seek(0, os.SEEK_END)
+            for start, end, record in records:
+                status = record.get('status', '')
+                if status not in status_ids:
+                    status_ids[status] = len(meta['statuses'])
+                    meta['statuses'].append(status)
+                    meta['status_counts'].append(0)
+                length = len(record.get('content') or '')
+                try:
+                    when = datetime.fromisoformat(record['timestamp'])
+                except (KeyError, TypeError, ValueError):
+                    when = None
+                idx.write(self.ROW.pack(when.timestamp() if when else 0.0, status_ids[status], length, start))
+                
+                meta['status_counts'][status_ids[status]] += 1
+                if length:
+                    meta['content_chars'] += length
+                    meta['content_posts'] += 1
+                if when:
+                    meta['first'] = min(meta['first'] or record['timestamp'], record['timestamp'])
+                    meta['last'] = max(meta['last'] or record['timestamp'], record['timestamp'])
+                    if status == 'success':
+                        year, week, _ = when.isocalendar()
+                        key = f"{year}-W{week:02d}"
+                        meta['success_weeks'][key] = meta['success_weeks'].get(key, 0) + 1
+                meta['indexed_bytes'] = end
+                added += 1
+            idx.flush()
+            os.fsync(idx.fileno())
+        
+        meta['rows'] += added
+        meta['head_hash'] = head_hash
+        if not appendable:
+            meta['indexed_bytes'] = size
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self.meta = meta
+        return added
+    
+    def rows(self, batch=4096):
+        """Yield (timestamp, status, content length, offset) without loading the index
+
+        Timestamps are POSIX seconds, 0.0 for records without a readable one.
+        """
+        statuses = self.meta['statuses']
+        with open(self.idx_path, 'rb') as idx:
+            remaining = self.meta['rows']
+            while remaining > 0:
+                data = idx.read(min(batch, remaining) * self.ROW.size)
+                if not data:
+                    return
+                for timestamp, status_id, length, offset in self.ROW.iter_unpack(data):
+                    yield timestamp, statuses[status_id], length, offset
+                remaining -= len(data) // self.ROW.size
+    
+    def record_at(self, offset):
+        """Read the single record stored at a byte offset"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            if self.path.endswith('.jsonl'):
+                return json.loads(f.readline())
+            return json.JSONDecoder().raw_decode(f.read(1 << 20).decode('utf-8', 'ignore'))[0]
+    
+    def range_aggregates(self, since, until):
+        """Aggregates shaped like the metadata's, over rows timestamped in [since, until)
+
+        Streams the .idx columns, so memory does not grow with the history.
+        """
+        counts = {}
+        aggregates = {'rows': 0, 'content_chars': 0, 'content_posts': 0, 'first': None, 'last': None, 'success_weeks': {}}
+        for timestamp, status, length, _ in self.rows():
+            if not since <= timestamp < until:
+                continue
+            aggregates['rows'] += 1
+            counts[status] = counts.get(status, 0) + 1
+            if length:
+                aggregates['content_chars'] += length
+                aggregates['content_posts'] += 1
+            when = datetime.fromtimestamp(timestamp)
+            aggregates['first'] = min(aggregates['first'] or when.isoformat(), when.isoformat())
+            aggregates['last'] = max(aggregates['last'] or when.isoformat(), when.isoformat())
+            if status == 'success':
+                year, week, _ = when.isocalendar()
+                key = f"{year}-W{week:02d}"
+                aggregates['success_weeks'][key] = aggregates['success_weeks'].get(key, 0) + 1
+        aggregates['statuses'] = list(counts)
+        aggregates['status_counts'] = list(counts.values())
+        return aggregates
+
+def history_indexes():
+    """Up-to-date sidecar indexes for every history file, oldest first"""
+    paths = _legacy_history_files() + history_files()
+    indexes = []
+    for path in paths:
+        index = HistoryIndex(path)
+        index.update()
+        indexes.append(index)
+    return indexes
+
+def history_report(top=5, weeks=8, since=None, until=None, failures=0):
+    """Aggregate statistics over the post history, optionally between two datetimes
+
+    The whole history is answered from the sidecar metadata alone, so the
+    cost depends on the number of history files and distinct statuses, not
+    on the number of posts. A time range is answered by streaming the .idx
+    columns. `failures` adds the most recent failed records in the range,
+    read back through their byte offsets.
+    """
+    ranged = since is not None or until is not None
+    since = since.timestamp() if since else float('-inf')
+    until = until.timestamp() if until else float('inf')
+    recent_failures = []
+    total = 0
+    by_category = {}
+    by_status = {}
+    per_week = {}
+    content_chars = 0
+    content_posts = 0
+    first = last = None
+    
+    for index in history_indexes():
+        meta = index.range_aggregates(since, until) if ranged else index.meta
+        if failures:
+            failed = (
+                (timestamp, offset, index)
+                for timestamp, status, _, offset in index.rows()
+                if status != 'success' and since <= timestamp < until
+            )
+            recent_failures = heapq.nlargest(failures, itertools.chain(recent_failures, failed), key=lambda row: row[0])
+        total += meta['rows']
+        for status, count in zip(meta['statuses'], meta['status_counts']):
+            category = status.split(':', 1)[0] or 'unknown'
+            by_category[category] = by_category.get(category, 0) + count
+            if category != 'success':
+                by_status[status] = by_status.get(status, 0) + count
+        for week, count in meta['success_weeks'].items():
+            per_week[week] = per_week.get(week, 0) + count
+        content_chars += meta['content_chars']
+        content_posts += meta['content_posts']
+        if meta['first']:
+            first = min(first or meta['first'], meta['first'])
+            last = max(last or meta['last'], meta['last'])
+    
+    report = {
+        'total': total,
+        'by_status': by_category,
+        'failure_rate': round(1 - by_category.get('success', 0) / total, 4) if total else 0.0,
+        'average_length': round(content_chars / content_posts, 1) if content_posts else 0.0,
+        'first': first,
+        'last': last,
+        'posts_per_week': dict(sorted(per_week.items())[-weeks:]),
+        'top_errors': sorted(by_status.items(), key=lambda item: -item[1])[:top],
+    }
+    if failures:
+        report['recent_failures'] = []
+        for _, offset, index in recent_failures:
+            record = index.record_at(offset)
+            report['recent_failures'].append({
+                'timestamp': record.get('timestamp'),
+                'status': record.get('status'),
+                'content': (record.get('content') or '')[:200],
+            })
+    return report
+
+def print_history_report(report):
+    print(f"📊 {report['total']} records ({report['first']} → {report['last']})")
+    print(f"Failure rate: {report['failure_rate']:.1%}")
+    for category, count in sorted(report['by_status'].items(), key=lambda item: -item[1]):
+        print(f"  {category:<10} {count}")
+    print(f"Average post length: {report['average_length']:.0f} characters")
+    print("Posts per week:")
+    for week, count in report['posts_per_week'].items():
+        print(f"  {week}  {'█' * count} {count}")
+    if report['top_errors']:
+        print("Most common errors:")
+        for status, count in report['top_errors']:
+            print(f"  {count:>4}  {status[:120]}")
+    if report.get('recent_failures'):
+        print("Most recent failures:")
+        for record in report['recent_failures']:
+            print(f"  {record['timestamp']}  {record['status'][:100]}")
+            if record['content']:
+                print(f"      {record['content'][:100]!r}")
+
+def _load_engagement():
+    try:
+        with open(state_path(ENGAGEMENT_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _engagement_stale(entry, published_at, now):
+    """Whether a cached entry is due for a refresh given the post's age"""
+    if entry is None:
+        return True
+    age = now - published_at
+    for max_age, interval in ENGAGEMENT_REFRESH:
+        if age < max_age:
+            return now - entry['fetched_at'] >= interval
+    # Old posts only need one reading taken after they settled
+    return entry['fetched_at'] - published_at < ENGAGEMENT_REFRESH[-1][0]
+
+def _fetch_social_actions(post_ids, access_token=None):
+    """Likes and comments for up to ENGAGEMENT_BATCH_SIZE posts in one batch GET"""
+    ids = ','.join(quote(post_id, safe='') for post_id in post_ids)
+    response = http_request(
+        'GET',
+        f'{LINKEDIN_API_BASE}/v2/socialActions?ids=List({ids})',
+        headers=_linkedin_headers(access_token)
+    )
+    if response.status_code != 200:
+        raise Exception(f"socialActions batch failed: {response.status_code} - {response.text}")
+    counts = {}
+    for post_id, result in response.json().get('results', {}).items():
+        counts[post_id] = {
+            'likes': result.get('likesSummary', {}).get('totalLikes', 0),
+            'comments': result.get('commentsSummary', {}).get('aggregatedTotalComments', 0),
+        }
+    return counts
+
+def _fetch_impressions(post_id, access_token=None):
+    """Lifetime impressions of one post, or None if the token can't read analytics"""
+    kind = 'ugc' if ':ugcPost:' in post_id else 'share'
+    response = http_request(
+        'GET',
+        f'{LINKEDIN_API_BASE}/rest/memberCreatorPostAnalytics?q=entity'
+        f'&entity=({kind}:{quote(post_id, safe="")})&queryType=IMPRESSION&aggregation=TOTAL',
+        headers=dict(_linkedin_headers(access_token), **{'LinkedIn-Version': LINKEDIN_API_VERSION})
+    )
+    if response.status_code in (401, 403):
+        return None
+    if response.status_code != 200:
+        raise Exception(f"Post analytics failed for {post_id}: {response.status_code} - {response.text}")
+    return sum(element.get('count', 0) for element in response.json().get('elements', []))
+
+def _fetch_permitted_impressions(post_id, access_token, denied):
+    """_fetch_impressions, skipped once the token has been refused analytics"""
+    if denied.is_set():
+        return None
+    impressions = _fetch_impressions(post_id, access_token)
+    if impressions is None:
+        denied.set()
+    return impressions
+
+def sync_engagement(force=False, roster=None):
+    """Refresh likes, comments and impressions of stale published posts
+
+    Posts come from the history (records with a post_id). Only entries
+    whose refresh interval has passed are fetched: socialActions in
+    batches of ENGAGEMENT_BATCH_SIZE, impressions per post, all on
+    ENGAGEMENT_CONCURRENCY threads behind the LinkedIn rate limiter.
+    Batch accounts' posts are fetched with their own tokens from `roster`
+    (load_roster() accounts) and skipped without it. Once an account's
+    token is refused analytics, its other posts skip the impressions call.
+    Returns (posts fetched, posts fresh in the cache).
+    """
+    tokens = {None: None}
+    tokens.update((account['name'], account['access_token']) for account in roster or [])
+    published = {}
+    accounts = {}
+    for record in iter_post_records():
+        if record.get('status') == 'success' and record.get('post_id') and record.get('account') in tokens:
+            published[record['post_id']] = record['timestamp']
+            accounts[record['post_id']] = record.get('account')
+    
+    cache = _load_engagement()
+    now = time.time()
+    stale = [
+        post_id for post_id, timestamp in published.items()
+        if force or _engagement_stale(cache.get(post_id), datetime.fromisoformat(timestamp).timestamp(), now)
+    ]
+    if not stale:
+        return 0, len(published)
+    
+    by_account = {}
+    for post_id in stale:
+        by_account.setdefault(accounts[post_id], []).append(post_id)
+    denied = {account: threading.Event() for account in by_account}
+    with ThreadPoolExecutor(max_workers=ENGAGEMENT_CONCURRENCY) as executor:
+        social_futures = []
+        impression_futures = {}
+        for account, post_ids in by_account.items():
+            token = tokens[account]
+            for i in range(0, len(post_ids), ENGAGEMENT_BATCH_SIZE):
+                social_futures.append(executor.submit(_fetch_social_actions, post_ids[i:i + ENGAGEMENT_BATCH_SIZE], token))
+            for post_id in post_ids:
+                impression_futures[post_id] = executor.submit(_fetch_permitted_impressions, post_id, token, denied[account])
+        counts = {}
+        for future in social_futures:
+            counts.update(future.result())
+        impressions = {post_id: future.result() for post_id, future in impression_futures.items()}
+    for account, refused in denied.items():
+        if refused.is_set():
+            label = f"[{account}] " if account else ""
+            print(f"⚠️ {label}Impressions need the r_member_postAnalytics scope; syncing likes and comments only")
+    
+    fetched_at = time.time()
+    updates = {}
+    for post_id in stale:
+        if post_id not in counts:
+            continue
+        updates[post_id] = dict(
+            counts[post_id],
+            impressions=impressions[post_id],
+            published_at=published[post_id],
+            fetched_at=fetched_at,
+        )
+    with _file_lock(state_path(ENGAGEMENT_FILE)):
+        cache = _load_engagement()
+        cache.update(updates)
+        tmp_path = state_path(ENGAGEMENT_FILE) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, state_path(ENGAGEMENT_FILE))
+    run_metrics().add('engagement_posts_fetched', len(updates))
+    return len(updates), len(published) - len(stale)
+
+def print_engagement(limit=10):
+    """The most recent posts' engagement from the cache"""
+    cache = _load_engagement()
+    rows = sorted(cache.items(), key=lambda item: item[1]['published_at'], reverse=True)[:limit]
+    print(f"{'published':<17} {'likes':>6} {'comments':>9} {'impressions':>12}  post")
+    for post_id, entry in rows:
+        impressions = entry['impressions'] if entry['impressions'] is not None else '-'
+        print(f"{entry['published_at'][:16]:<17} {entry['likes']:>6} {entry['comments']:>9} {impressions:>12}  {post_id}")
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("The optimizer needs numpy (pip install numpy)")
+    return numpy
+
+class EngagementOptimizer:
+    """Expected engagement per weekday, hour, format, industry and booster
+
+    Published posts with cached engagement are loaded into parallel integer
+    arrays, one per dimension, plus a score array (ENGAGEMENT_WEIGHTS,
+    decayed with OPTIMIZER_HALF_LIFE_DAYS). Per-option totals are single
+    bincounts. Records written before plans were stored get the plan the
+    day-of-year rotation gave them. Weekday and hour are UTC, matching
+    scheduled_slots() and the cron schedule.
+    """
+    
+    DIMENSIONS = {
+        'weekday': list(DAY_THEMES),
+        'hour': [f'{hour:02d}:00' for hour in range(24)],
+        'format': [post_format['type'] for post_format in VIRAL_FORMATS],
+        'industry': [industry[0] for industry in INDUSTRY_CHOICES],
+        'booster': ENGAGEMENT_BOOSTERS,
+    }
+    
+    def __init__(self):
+        self.np = _numpy()
+        self.columns, self.scores, self.weights = self._load()
+    
+    def _load(self):
+        np = self.np
+        engagement = _load_engagement()
+        lookup = {dimension: {name: i for i, name in enumerate(names)} for dimension, names in self.DIMENSIONS.items()}
+        rows = []
+        scores = []
+        ages = []
+        now = datetime.now(timezone.utc)
+        for record in iter_post_records():
+            entry = engagement.get(record.get('post_id'))
+            if entry is None or record.get('status') != 'success':
+                continue
+            timestamp = datetime.fromisoformat(record['timestamp'])
+            chosen = record.get('plan') or plan_summary(post_plan(timestamp))
+            # Weekday and hour in UTC, as scheduled; older records only have the local timestamp
+            published = datetime.fromisoformat(record['published_at']) if record.get('published_at') else timestamp
+            published = published.astimezone(timezone.utc)
+            row = (
+                published.weekday(),
+                published.hour,
+                lookup['format'].get(chosen['format'], -1),
+                lookup['industry'].get(chosen['industry'], -1),
+                lookup['booster'].get(chosen['booster'], -1),
+            )
+            if -1 in row:
+                continue  # an option that no longer exists
+            rows.append(row)
+            scores.append(sum(entry.get(name, 0) * weight for name, weight in ENGAGEMENT_WEIGHTS.items()))
+            ages.append((now - published).total_seconds() / 86400)
+        
+        table = np.array(rows, dtype=np.int16).reshape(-1, len(self.DIMENSIONS))
+        columns = {dimension: table[:, i] for i, dimension in enumerate(self.DIMENSIONS)}
+        weights = 0.5 ** (np.array(ages, dtype=np.float64) / OPTIMIZER_HALF_LIFE_DAYS)
+        return columns, np.array(scores, dtype=np.float64), weights
+    
+    def stats(self, dimension):
+        """(effective posts, posterior mean score, posterior std) per option of `dimension`
+
+        Means are shrunk towards the overall mean with OPTIMIZER_PRIOR_POSTS
+        pseudo-posts, so rarely used options aren't judged on one post.
+        """
+        np = self.np
+        options = len(self.DIMENSIONS[dimension])
+        index = self.columns[dimension]
+        if not len(index):
+            zeros = np.zeros(options)
+            return zeros, zeros, np.ones(options)
+        total_weight = self.weights.sum()
+        overall = (self.scores * self.weights).sum() / total_weight
+        spread = np.sqrt((self.weights * (self.scores - overall) ** 2).sum() / total_weight) or 1.0
+        
+        counts = np.bincount(index, weights=self.weights, minlength=options)
+        sums = np.bincount(index, weights=self.scores * self.weights, minlength=options)
+        means = (sums + OPTIMIZER_PRIOR_POSTS * overall) / (counts + OPTIMIZER_PRIOR_POSTS)
+        stds = spread / np.sqrt(counts + OPTIMIZER_PRIOR_POSTS)
+        return counts, means, stds
+    
+    def choose(self, rng=None):
+        """Thompson-sampled (format, industry, booster) indexes for post_plan"""
+        rng = rng or self.np.random.default_rng()
+        choice = []
+        for dimension in ('format', 'industry', 'booster'):
+            _, means, stds = self.stats(dimension)
+            choice.append(int(self.np.argmax(rng.normal(means, stds))))
+        return tuple(choice)
+    
+    def report(self):
+        """Options of every dimension, best expected engagement first"""
+        report = {'posts': int(len(self.scores))}
+        for dimension, names in self.DIMENSIONS.items():
+            counts, means, _ = self.stats(dimension)
+            order = self.np.argsort(-means)
+            report[dimension] = [
+                {'option': names[i], 'posts': round(float(counts[i]), 2), 'expected_score': round(float(means[i]), 2)}
+                for i in order
+            ]
+        return report
+
+def print_optimizer_report(report, top=3):
+    print(f"Engagement model over {report['posts']} published post(s) with metrics")
+    for dimension in EngagementOptimizer.DIMENSIONS:
+        options = [option for option in report[dimension] if option['posts'] > 0][:top]
+        if not options:
+            continue
+        best = ', '.join(f"{option['option']} ({option['expected_score']}, n={option['posts']})" for option in options)
+        print(f"  {dimension:<9} {best}")
+
+# CONTENT FOCUS areas from the prompt, with the phrases that identify them in a post
+CONTENT_TOPICS = [
+    ('Model architectures (transformers, diffusion, SSMs, Mamba)', ['transformer', 'transformers', 'diffusion', 'state space', 'SSM', 'SSMs', 'Mamba', 'mixture of experts', 'architecture', 'architectures']),
+    ('Training techniques (RLHF, DPO, curriculum learning, few-shot)', ['RLHF', 'DPO', 'curriculum learning', 'few-shot', 'pretraining', 'training technique', 'training techniques']),
+    ('Agentic AI (multi-agent, tool use, planning, ReAct)', ['agentic', 'Agentic', 'multi-agent', 'AI agents', 'agents', 'tool use', 'ReAct']),
+    ('Deployment & MLOps (quantization, pruning, distillation, serving)', ['MLOps', 'quantization', 'pruning', 'distillation', 'model serving', 'deployment', 'deployments']),
+    ('Data quality & pipelines (synthetic data, curation, labeling)', ['data quality', 'synthetic data', 'data curation', 'labeling', 'data pipeline', 'data pipelines']),
+    ('Real-world applications (specific industry use cases)', ['use case', 'use cases', 'real-world', 'in production']),
+    ('Benchmarks & evaluation', ['benchmark', 'benchmarks', 'evaluation', 'leaderboard', 'MMLU']),
+    ('Ethics & safety (bias, fairness, alignment, interpretability)', ['bias', 'fairness', 'alignment', 'interpretability', 'explainability', 'Explainable AI', 'XAI', 'responsible AI', 'AI safety']),
+    ('Open source releases (models, frameworks, libraries)', ['open source', 'open-source', 'open weights', 'open-weight']),
+    ('Research breakthroughs (new papers, surprising findings)', ['breakthrough', 'breakthroughs', 'new paper', 'surprising finding']),
+    ('Industry adoption (survey data, implementation patterns)', ['adoption', 'survey', 'enterprises', 'implementation']),
+    ('Cost & efficiency (inference and training costs)', ['inference cost', 'inference costs', 'training cost', 'training costs', 'efficiency', 'cheaper']),
+    ('Emerging techniques (RAG, prompt engineering, fine-tuning)', ['RAG', 'retrieval-augmented', 'prompt engineering', 'fine-tuning', 'LoRA']),
+    ('Multimodal AI (vision-language, audio, video)', ['multimodal', 'Multimodal', 'vision-language', 'audio', 'video']),
+    ('Edge & mobile ML (on-device models, TinyML)', ['edge devices', 'on-device', 'mobile', 'TinyML', 'edge AI']),
+]
+
+# SOURCES from the prompt: research (academic and lab) vs industry (reports, press, community).
+# Matching is case-sensitive so "WHO" or "Nature" don't match ordinary words.
+RESEARCH_SOURCES = [
+    ('Stanford HAI', ['Stanford']), ('MIT CSAIL', ['MIT CSAIL', 'MIT']), ('Carnegie Mellon', ['Carnegie Mellon', 'CMU']),
+    ('UC Berkeley AI Research', ['Berkeley']), ('Oxford', ['Oxford']), ('Cambridge', ['Cambridge']),
+    ('Vector Institute', ['Vector Institute']), ('MILA', ['MILA', 'Mila']), ('ETH Zurich', ['ETH Zurich']),
+    ('Max Planck Institute', ['Max Planck']), ('Allen Institute for AI', ['Allen Institute', 'AI2']),
+    ('Google Research', ['Google Research', 'Google Brain']), ('DeepMind', ['DeepMind']),
+    ('Meta AI Research (FAIR)', ['Meta AI', 'FAIR']), ('Microsoft Research', ['Microsoft Research']),
+    ('OpenAI Research', ['OpenAI']), ('Anthropic Research', ['Anthropic']), ('NVIDIA AI Research', ['NVIDIA', 'Nvidia']),
+    ('IBM Research', ['IBM Research', 'IBM']), ('Amazon Science', ['Amazon Science']),
+    ('Apple Machine Learning Research', ['Apple Machine Learning', 'Apple ML']), ('Hugging Face Research', ['Hugging Face']),
+    ('Cohere Research', ['Cohere']), ('arXiv paper (with title)', ['arXiv', 'arxiv']), ('Nature', ['Nature']),
+    ('NeurIPS / ICML / ICLR / CVPR proceedings', ['NeurIPS', 'ICML', 'ICLR', 'CVPR']),
+    ('Journal of Machine Learning Research', ['Journal of Machine Learning Research', 'JMLR']),
+]
+INDUSTRY_SOURCES = [
+    ('McKinsey', ['McKinsey']), ('Gartner', ['Gartner']), ('Forrester', ['Forrester']), ('IDC', ['IDC']),
+    ('Deloitte Insights', ['Deloitte']), ('PwC Research', ['PwC']), ('Accenture Research', ['Accenture']),
+    ('BCG Gamma', ['BCG']), ('CB Insights', ['CB Insights']), ('Crunchbase News', ['Crunchbase']),
+    ('MIT Technology Review', ['MIT Technology Review']), ('The Gradient', ['The Gradient']),
+    ('Towards Data Science', ['Towards Data Science']), ('VentureBeat AI', ['VentureBeat']), ('The Decoder', ['The Decoder']),
+    ('AI Index Report (Stanford)', ['AI Index']), ('State of AI Report', ['State of AI']),
+    ('GitHub trending repo (with stars)', ['GitHub']), ('Papers with Code benchmark', ['Papers with Code']),
+    ('Kaggle', ['Kaggle']), ('PyTorch blog', ['PyTorch']), ('TensorFlow blog', ['TensorFlow']), ('Fast.ai', ['fast.ai', 'Fast.ai']),
+    ('Federal Reserve research', ['Federal Reserve']), ('BIS papers', ['BIS']), ('IMF reports', ['IMF']),
+    ('NEJM', ['NEJM']), ('JAMA', ['JAMA']), ('WHO reports', ['WHO', 'World Health Organization']), ('FDA publications', ['FDA']),
+    ('NRF research', ['NRF']), ('eMarketer', ['eMarketer']), ('Shopify research', ['Shopify']),
+]
+
+def _phrase_matcher(entries, flags=0):
+    """One regex matching every alias, mapped back to its entry name
+
+    Longer aliases come first so "MIT Technology Review" wins over "MIT".
+    """
+    owner = {}
+    for name, aliases in entries:
+        for alias in aliases:
+            owner.setdefault(alias if not flags else alias.lower(), name)
+    pattern = '|'.join(re.escape(alias) for alias in sorted(owner, key=len, reverse=True))
+    return re.compile(rf'(?<![\w.])(?:{pattern})(?![\w])', flags), owner
+
+class TopicPlanner:
+    """Tracks when each CONTENT FOCUS topic and each source was last used
+
+    Uses come from the plan stored with each published post; posts written
+    before plans were stored are matched against the topic and source
+    aliases. The state file remembers how far each history file has been
+    scanned, so planning only reads posts written since the last run.
+    Drafts waiting in the queue or the outbox count as in use.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or state_path(TOPIC_PLANNER_FILE)
+        self.topic_matcher, self.topic_owner = _phrase_matcher(CONTENT_TOPICS, re.IGNORECASE)
+        self.source_matcher, self.source_owner = _phrase_matcher(RESEARCH_SOURCES + INDUSTRY_SOURCES)
+        try:
+            with open(self.path, 'r') as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.state = {'files': {}, 'topics': {}, 'sources': {}}
+        self.reserved = {}
+        self.lock = threading.Lock()
+    
+    def extract(self, content):
+        """Topics and sources mentioned in a post"""
+        topics = {self.topic_owner[m.group(0).lower()] for m in self.topic_matcher.finditer(content)}
+        sources = {self.source_owner[m.group(0)] for m in self.source_matcher.finditer(content)}
+        return topics, sources
+    
+    def _plan_uses(self, plan, content=''):
+        """Topics and sources a post used: from its stored plan, else from its text"""
+        if plan and plan.get('planned_topic'):
+            sources = {plan[field] for field in PLANNED_FIELDS[1:] if plan.get(field)}
+            return {plan['planned_topic']}, sources
+        return self.extract(content)
+    
+    def _observe(self, record):
+        if record.get('status') != 'success' or not record.get('content'):
+            return
+        timestamp = record.get('timestamp', '')
+        topics, sources = self._plan_uses(record.get('plan'), record['content'])
+        for name in topics:
+            self.state['topics'][name] = max(self.state['topics'].get(name, ''), timestamp)
+        for name in sources:
+            self.state['sources'][name] = max(self.state['sources'].get(name, ''), timestamp)
+    
+    def update(self):
+        """Scan history written since the last update"""
+        paths = _legacy_history_files() + history_files()
+        for path in paths:
+            size = os.path.getsize(path)
+            seen = self.state['files'].get(path, 0)
+            if seen == size:
+                continue
+            if not path.endswith('.jsonl'):
+                records = iter_json_array(path)
+            else:
+                # A shard that shrank was rewritten; rescanning is harmless since only the latest use counts
+                records = iter_jsonl(path, seen if seen < size else 0)
+            end = seen
+            for _, end, record in records:
+                self._observe(record)
+            self.state['files'][path] = end if path.endswith('.jsonl') else size
+        # posts.json disappears once migrated
+        self.state['files'] = {path: seen for path, seen in self.state['files'].items() if path in paths}
+        
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def _pending_plans(self):
+        """Plans of queued drafts and of outbox entries not yet published"""
+        for path in queued_drafts():
+            try:
+                with open(path, 'r') as f:
+                    yield json.load(f).get('plan')
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue  # claimed by a publisher meanwhile
+        for entry in outbox_entries():
+            if entry['state'] in ('pending', 'sending'):
+                yield entry['fields'].get('plan')
+    
+    def _least_recent(self, names, used, reserved):
+        # Never-used names sort first; ties keep the prompt's order
+        return min(names, key=lambda name: reserved.get(name) or used.get(name, ''))
+    
+    def choose(self):
+        """Least recently used topic plus one research and one industry source
+
+        Plans of queued and outbox drafts count as used now. The pick is
+        also reserved in memory, so drafts generated back to back in one
+        process (generate-ahead, batch) don't all get the same plan even
+        before they are written.
+        """
+        with self.lock:
+            self.update()
+            now = datetime.now().isoformat()
+            reserved = dict(self.reserved)
+            for plan in self._pending_plans():
+                if plan:
+                    topics, sources = self._plan_uses(plan)
+                    for name in topics | sources:
+                        reserved[name] = max(reserved.get(name, ''), now)
+            topic = self._least_recent([name for name, _ in CONTENT_TOPICS], self.state['topics'], reserved)
+            research = self._least_recent([name for name, _ in RESEARCH_SOURCES], self.state['sources'], reserved)
+            industry = self._least_recent([name for name, _ in INDUSTRY_SOURCES], self.state['sources'], reserved)
+            for name in (topic, research, industry):
+                self.reserved[name] = now
+        return {
+            'planned_topic': topic,
+            'planned_research_source': research,
+            'planned_industry_source': industry,
+        }
+
+_topic_planners = {}
+_topic_planner_lock = threading.Lock()
+
+def topic_planner():
+    """Process-wide topic planner of the current history, loaded on first use"""
+    path = state_path(TOPIC_PLANNER_FILE)
+    with _topic_planner_lock:
+        if path not in _topic_planners:
+            _topic_planners[path] = TopicPlanner(path)
+        return _topic_planners[path]
+
+def load_roster(path):
+    """Accounts for batch mode from a JSON list of {name, access_token_env | access_token, person_urn}
+
+    Names must be unique: they key each account's outbox entries and
+    history records, and a batch posts once per name.
+    """
+    with open(path, 'r') as f:
+        entries = json.load(f)
+    
+    accounts = []
+    for entry in entries:
+        name = entry.get('name')
+        token = entry.get('access_token') or os.environ.get(entry.get('access_token_env', ''))
+        if not name or not token:
+            raise Exception(f"Roster entry {entry.get('name', '?')} needs a name and an access token")
+        if any(account['name'] == name for account in accounts):
+            raise Exception(f"Roster lists {name} more than once")
+        accounts.append({'name': name, 'access_token': token, 'person_urn': entry.get('person_urn')})
+    return accounts
+
+async def _post_for_account(account, semaphore):
+    """Generate, publish and record one post for a roster account"""
+    name = account['name']
+    async with semaphore:
+        entry = None
+        try:
+            # URN lookup runs alongside generation, as in a single run
+            urn_task = None
+            if not account['person_urn']:
+                urn_task = asyncio.create_task(asyncio.to_thread(resolve_person_urn, account['access_token']))
+            entry = await asyncio.to_thread(recover_outbox, name, account['person_urn'], account['access_token'])
+            if entry:
+                print(f"[{name}] Retrying unpublished draft from {entry['created_at']}...")
+            else:
+                print(f"[{name}] Generating post content...")
+                plan = await asyncio.to_thread(choose_plan)
+                content = await asyncio.to_thread(generate_post_content, None, plan)
+                entry = await asyncio.to_thread(outbox_add, content, account=name, plan=plan_summary(plan))
+            person_urn = account['person_urn'] or await urn_task
+            
+            print(f"[{name}] Posting to LinkedIn...")
+            published = await asyncio.to_thread(publish_outbox_entry, entry, person_urn, account['access_token'])
+            status = 'success' if published else 'failed'
+            if published:
+                print(f"[{name}] ✅ Successfully posted to LinkedIn!")
+        except Exception as e:
+            print(f"[{name}] ❌ Error: {str(e)}")
+            status = f'error: {str(e)}'
+            if urn_task is not None and not urn_task.done():
+                urn_task.cancel()
+            fields = {'outbox_key': entry['key']} if entry else {}
+            await asyncio.to_thread(save_post_record, entry['content'] if entry else "", status, account=name, **fields)
+        
+        run_metrics().add('accounts_posted' if status == 'success' else 'accounts_failed')
+        return name, status
+
+async def run_batch(accounts, concurrency=None):
+    """Post for every account concurrently; returns {account name: status}"""
+    semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+    results = await asyncio.gather(*(_post_for_account(account, semaphore) for account in accounts))
+    return dict(results)
+
+def scheduled_slots(count, after=None):
+    """The next `count` scheduled post times after `after` (naive UTC)"""
+    after = after or datetime.now(timezone.utc).replace(tzinfo=None)
+    valid_days = set(DAY_THEMES)
+    if not any(day in valid_days for day in POST_SCHEDULE_DAYS):
+        raise Exception(f"POST_SCHEDULE_DAYS has no valid weekday: {POST_SCHEDULE_DAYS}")
+    hour, minute = (int(part) for part in POST_SCHEDULE_TIME.split(':'))
+    
+    slots = []
+    slot = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    while len(slots) < count:
+        if slot > after and slot.strftime('%A') in POST_SCHEDULE_DAYS:
+            slots.append(slot)
+        slot += timedelta(days=1)
+    return slots
+
+def _queue_path(slot):
+    return os.path.join(state_path(QUEUE_DIR), slot.strftime('%Y-%m-%dT%H%M') + '.json')
+
+def queued_drafts():
+    """Paths of queued drafts, earliest slot first"""
+    return sorted(glob.glob(os.path.join(glob.escape(state_path(QUEUE_DIR)), '*.json')))
+
+def _draft_key(draft):
+    """Outbox key for a queued draft, the same in every run"""
+    return hashlib.sha256(f"{draft['slot']} {draft['generated_at']}".encode('utf-8')).hexdigest()[:32]
+
+def release_stale_claims(max_age=QUEUE_CLAIM_TIMEOUT):
+    """Return drafts claimed by a publisher that died to the queue
+
+    A claimed draft whose outbox entry was already written (or published)
+    is just removed, so it can't go out twice.
+    """
+    for claimed in glob.glob(os.path.join(glob.escape(state_path(QUEUE_DIR)), '*.*.publishing')):
+        # The claim time is in the name, since a checkout resets file times
+        base, claimed_at, _ = claimed.rsplit('.', 2)
+        if not claimed_at.isdigit() or time.time() - int(claimed_at) < max_age:
+            continue
+        try:
+            with open(claimed, 'r') as f:
+                draft = json.load(f)
+        except FileNotFoundError:
+            continue
+        key = _draft_key(draft)
+        if any(entry['key'] == key for entry in outbox_entries()) or _recorded_in_history(key):
+            os.remove(claimed)
+        else:
+            print(f"Returning abandoned draft for {draft['slot']} to the queue")
+            os.replace(claimed, base + '.json')
+
+def generate_ahead(count):
+    """Fill the queue with validated drafts for the next `count` slots"""
+    os.makedirs(state_path(QUEUE_DIR), exist_ok=True)
+    
+    # Queued drafts count as "already posted" while generating, so the queue
+    # doesn't repeat itself; they are only indexed for real once published
+    index = duplicate_index()
+    queued_keys = []
+    for path in queued_drafts():
+        with open(path, 'r') as f:
+            draft = json.load(f)
+        queued_keys.append(f"queued draft for {draft['slot']}")
+        index.add(queued_keys[-1], draft['content'], persist=False)
+    
+    generated = 0
+    try:
+        for slot in scheduled_slots(count):
+            path = _queue_path(slot)
+            if os.path.exists(path):
+                continue
+            print(f"Generating draft for {slot.strftime('%A %B %d, %Y %H:%M')} UTC...")
+            plan = choose_plan(slot)
+            with run_metrics().stage(f"generate {slot.isoformat()}"):
+                content = generate_post_content(now=slot, plan=plan)
+            draft = {
+                'slot': slot.isoformat(),
+                'generated_at': datetime.now().isoformat(),
+                'content': content,
+                'plan': plan_summary(plan)
+            }
+            _write_json_durably(path, draft)
+            queued_keys.append(f"queued draft for {draft['slot']}")
+            index.add(queued_keys[-1], content, persist=False)
+            generated += 1
+    finally:
+        for key in queued_keys:
+            index.remove(key)
+    
+    print(f"✅ Queued {generated} new draft(s), {len(queued_drafts())} waiting")
+    return generated
+
+def _write_json_durably(path, data):
+    """Write JSON to `path` so a crash leaves either the old or the new file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+def _outbox_path(entry):
+    return os.path.join(state_path(OUTBOX_DIR), f"{entry['created_at'].replace(':', '')}-{entry['key']}.json")
+
+def outbox_entries():
+    """Outbox entries, oldest first"""
+    entries = []
+    for path in sorted(glob.glob(os.path.join(glob.escape(state_path(OUTBOX_DIR)), '*.json'))):
+        try:
+            with open(path, 'r') as f:
+                entries.append(json.load(f))
+        except FileNotFoundError:
+            continue  # published by another thread meanwhile
+    return entries
+
+# Keys of entries a thread in this process is publishing, so no other thread picks them up
+_outbox_claims = set()
+_outbox_claims_lock = threading.Lock()
+
+def _claim_outbox_entry(key):
+    with _outbox_claims_lock:
+        if key in _outbox_claims:
+            return False
+        _outbox_claims.add(key)
+        return True
+
+def _release_outbox_entry(key):
+    with _outbox_claims_lock:
+        _outbox_claims.discard(key)
+
+def outbox_add(content, media=None, account=None, key=None, **fields):
+    """Persist a draft before anything is sent; returns the outbox entry
+
+    The entry's key identifies this draft from here on, in the outbox and
+    in the history record, so a retry can never turn into a second post.
+    `key` defaults to a fresh one. `fields` are passed on to the history
+    record.
+    """
+    os.makedirs(state_path(OUTBOX_DIR), exist_ok=True)
+    entry = {
+        'key': key or uuid.uuid4().hex,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'state': 'pending',
+        'attempts': 0,
+        'content': content,
+        'media': media or [],
+        'account': account,
+        'fields': fields,
+    }
+    _claim_outbox_entry(entry['key'])
+    _write_json_durably(_outbox_path(entry), entry)
+    return entry
+
+def _outbox_save(entry):
+    _write_json_durably(_outbox_path(entry), entry)
+
+def _recorded_in_history(outbox_key):
+    """Whether the history already has a success record for this outbox entry"""
+    for path in reversed(history_files()):
+        with open(path, 'r') as f:
+            for line in f:
+                if outbox_key not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('outbox_key') == outbox_key and record.get('status') == 'success':
+                    return True
+    return False
+
+def _outbox_finish(entry, post_id, recovering=False):
+    """Record a published entry in the history, then drop it from the outbox
+
+    When recovering, the record may already be there from a run that
+    crashed before the removal, so the history is checked first. The
+    record's `published_at` is UTC, like the schedule, unlike `timestamp`.
+    """
+    if not (recovering and _recorded_in_history(entry['key'])):
+        published_at = entry.get('published_at') or datetime.now(timezone.utc).isoformat(timespec='seconds')
+        fields = dict(entry['fields'], post_id=post_id, outbox_key=entry['key'], published_at=published_at)
+        if entry['account']:
+            fields['account'] = entry['account']
+        with run_metrics().stage('record'):
+            save_post_record(entry['content'], 'success', **fields)
+    os.remove(_outbox_path(entry))
+
+def published_post_id(response):
+    """The share URN LinkedIn assigned to a post it just accepted"""
+    post_id = response.headers.get('x-restli-id')
+    if not post_id:
+        try:
+            post_id = response.json().get('id', '')
+        except ValueError:
+            post_id = ''
+    return post_id
+
+def find_published_post(content, person_urn=None, access_token=None):
+    """ID of the author's recent post with exactly this text, '' if none
+
+    Raises if LinkedIn can't be asked (the token may lack r_member_social).
+    """
+    if not person_urn:
+        person_urn = resolve_person_urn(access_token)
+    authors = quote(f"List({quote(f'urn:li:person:{person_urn}', safe='')})", safe='(),%')
+    response = http_request(
+        'GET',
+        f'{LINKEDIN_API_BASE}/v2/ugcPosts?q=authors&authors={authors}&sortBy=LAST_MODIFIED&count=20',
+        headers=_linkedin_headers(access_token)
+    )
+    if response.status_code != 200:
+        raise Exception(f"Post lookup failed: {response.status_code} - {response.text}")
+    for post in response.json().get('elements', []):
+        share = post.get('specificContent', {}).get('com.linkedin.ugc.ShareContent', {})
+        if share.get('shareCommentary', {}).get('text', '').strip() == content.strip():
+            return post['id']
+    return ''
+
+def recover_outbox(account=None, person_urn=None, access_token=None):
+    """Settle entries left by earlier runs; returns the oldest one still to publish
+
+    "published" entries crashed before their history record was written.
+    "sending" entries crashed (or got no clear answer) mid-request, so the
+    author's recent posts are checked before anything is sent again; if
+    that lookup fails they are left alone rather than risk a double post.
+    Entries another thread is publishing are skipped; the returned entry is
+    claimed until publish_outbox_entry() is done with it.
+    """
+    for entry in outbox_entries():
+        if entry['account'] != account or not _claim_outbox_entry(entry['key']):
+            continue
+        try:
+            ready = _settle_outbox_entry(entry, person_urn, access_token)
+        except Exception:
+            _release_outbox_entry(entry['key'])
+            raise
+        if ready:
+            return entry
+        _release_outbox_entry(entry['key'])
+    return None
+
+def _settle_outbox_entry(entry, person_urn, access_token):
+    """Resolve a "published" or "sending" entry; True if it is pending publication"""
+    if entry['state'] == 'published':
+        _outbox_finish(entry, entry['post_id'], recovering=True)
+        return False
+    if entry['state'] == 'sending':
+        try:
+            post_id = find_published_post(entry['content'], person_urn, access_token)
+        except Exception as e:
+            log.warning(f"⚠️ Can't tell whether draft {entry['key']} was published ({e}); "
+                        f"check LinkedIn and run `outbox --requeue {entry['key']}` or `outbox --drop {entry['key']}`")
+            return False
+        if post_id:
+            log.info(f"✅ Draft {entry['key']} was already published as {post_id}")
+            entry.update(state='published', post_id=post_id)
+            _outbox_save(entry)
+            _outbox_finish(entry, post_id)
+            return False
+        entry['state'] = 'pending'
+        _outbox_save(entry)
+    return entry['state'] == 'pending'
+
+def publish_outbox_entry(entry, person_urn=None, access_token=None, media=None):
+    """Publish an outbox entry at most once; returns True once LinkedIn has it
+
+    The entry is marked "sending" before the request goes out and only goes
+    back to "pending" when LinkedIn clearly rejected it. `media` is an
+    already uploaded media list; otherwise the entry's files are uploaded.
+    """
+    try:
+        return _send_outbox_entry(entry, person_urn, access_token, media)
+    finally:
+        _release_outbox_entry(entry['key'])
+
+def _send_outbox_entry(entry, person_urn, access_token, media):
+    if media is None and entry['media']:
+        with run_metrics().stage('media'):
+            media = upload_media(entry['media'], person_urn, access_token)
     
-    # Append to posts.json file
+    entry['state'] = 'sending'
+    entry['attempts'] += 1
+    _outbox_save(entry)
     try:
-        with open('posts.json', 'r') as f:
-            posts = json.load(f)
+        with run_metrics().stage('publish'):
+            response = post_to_linkedin(entry['content'], person_urn, access_token, media=media)
+    except requests.ConnectTimeout:
+        # Never reached LinkedIn
+        entry['state'] = 'pending'
+        _outbox_save(entry)
+        raise
+    
+    if response.status_code == 201:
+        post_id = published_post_id(response)
+        entry.update(state='published', post_id=post_id, published_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        _outbox_save(entry)
+        forget_media_uploads(media)
+        _outbox_finish(entry, post_id)
+        return True
+    
+    log.warning(f"❌ Failed to post: {response.status_code}")
+    log.warning(f"Response: {response.text}")
+    entry['last_error'] = f'{response.status_code}: {response.text[:500]}'
+    if response.status_code < 500:
+        # A 4xx means nothing was created; a 5xx might have been, so it stays "sending"
+        entry['state'] = 'abandoned' if entry['attempts'] >= OUTBOX_MAX_ATTEMPTS else 'pending'
+        if entry['state'] == 'abandoned':
+            log.warning(f"⚠️ Giving up on draft {entry['key']} after {entry['attempts']} attempts")
+    _outbox_save(entry)
+    fields = dict(entry['fields'], outbox_key=entry['key'])
+    if entry['account']:
+        fields['account'] = entry['account']
+    with run_metrics().stage('record'):
+        save_post_record(entry['content'], f'failed: {response.status_code}', **fields)
+    return False
+
+def outbox_command(args):
+    """List the outbox, or requeue / drop an entry by key"""
+    for entry in outbox_entries():
+        if entry['key'] == args.requeue:
+            entry.update(state='pending', attempts=0)
+            _outbox_save(entry)
+            print(f"Draft {entry['key']} will be published on the next run")
+            return
+        if entry['key'] == args.drop:
+            os.remove(_outbox_path(entry))
+            print(f"Dropped draft {entry['key']}")
+            return
+        if not (args.requeue or args.drop):
+            account = f" [{entry['account']}]" if entry['account'] else ''
+            print(f"{entry['key']}  {entry['state']:<9} {entry['created_at']}{account}  "
+                  f"attempts={entry['attempts']}  {entry['content'][:60]!r}")
+    if args.requeue or args.drop:
+        print(f"❌ No outbox entry {args.requeue or args.drop}")
+        exit(1)
+
+def lint_command(args):
+    """Print style reports for draft files, or for every queued and outbox draft"""
+    drafts = {}
+    for path in args.files:
+        with open(path, 'r') as f:
+            drafts[path] = f.read()
+    if not args.files:
+        for path in queued_drafts():
+            with open(path, 'r') as f:
+                drafts[path] = json.load(f)['content']
+        for entry in outbox_entries():
+            drafts[_outbox_path(entry)] = entry['content']
+    
+    reports = dict(zip(drafts, STYLE_LINTER.lint_batch(list(drafts.values()))))
+    if args.json:
+        print(json.dumps({
+            name: dict(report._asdict(), violations=[violation._asdict() for violation in report.violations])
+            for name, report in reports.items()
+        }, indent=2))
+        return
+    for name, report in reports.items():
+        verdict = '❌' if report.rejected else '✅'
+        print(f"{verdict} {name}: penalty {report.penalty}, {report.sentences} sentences, "
+              f"{report.avg_sentence_words} words/sentence (max {report.max_sentence_words}), "
+              f"reading ease {report.reading_ease}")
+        for violation in report.violations:
+            print(f"    {violation.rule:<16} @{violation.start:<5} {violation.text!r}")
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
     except FileNotFoundError:
-        posts = []
+        pass
+
+def publish_next(media_paths=None):
+    """Publish the earliest queued draft with optional media; returns True on success
+
+    Drafts left unpublished in the outbox go first, and drafts queued for
+    slots still in the future wait. Only falls back to live generation
+    when no draft is due, so a Groq outage does not affect publishing
+    while drafts remain.
+    """
+    entry = recover_outbox()
+    if entry:
+        print(f"Retrying unpublished draft from {entry['created_at']}...")
+        if publish_outbox_entry(entry):
+            print("✅ Successfully posted to LinkedIn!")
+            return True
+        return False
     
-    posts.append(record)
+    release_stale_claims()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for path in queued_drafts():
+        try:
+            with open(path, 'r') as f:
+                draft = json.load(f)
+        except FileNotFoundError:
+            continue
+        if datetime.fromisoformat(draft['slot']) > now:
+            break  # later files are later slots
+        
+        duplicate = duplicate_index().query(draft['content'])
+        if duplicate and DUPLICATE_POLICY == 'reject':
+            print(f"⚠️ Draft for {draft['slot']} is {duplicate[1]:.0%} similar to the post from {duplicate[0]}, dropping it")
+            _remove_if_exists(path)
+            continue
+        
+        # Links were checked when the draft was generated; the cache knows if one died since
+        content = verify_links(draft['content'], cached_only=not LINK_RECHECK_ON_PUBLISH)
+        if content is None:
+            print(f"⚠️ Draft for {draft['slot']} cites dead links, dropping it")
+            _remove_if_exists(path)
+            continue
+        
+        # Claim the draft by renaming it so parallel publishers can't both take it,
+        # then hand it straight to the outbox, which owns it from here on
+        claimed = path[:-len('.json')] + f'.{int(time.time())}.publishing'
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        fields = {'plan': draft['plan']} if 'plan' in draft else {}
+        entry = outbox_add(content, media=media_paths, key=_draft_key(draft), slot=draft['slot'], **fields)
+        os.remove(claimed)
+        print(f"Publishing draft for {draft['slot']}...")
+        if publish_outbox_entry(entry):
+            print("✅ Successfully posted to LinkedIn!")
+            return True
+        return False
     
-    with open('posts.json', 'w') as f:
-        json.dump(posts, f, indent=2)
+    print("No queued draft is due, generating a post now...")
+    post_once(media_paths)
+    return True
 
-def main():
+def _timed_urn_lookup():
+    with run_metrics().stage('urn'):
+        return resolve_person_urn()
+
+def _timed_media_upload(media_paths, urn_future):
+    with run_metrics().stage('media'):
+        return upload_media(media_paths, person_urn=urn_future.result())
+
+def post_once(media_paths=None):
+    metrics = run_metrics()
+    entry = None
     try:
-        # Generate content
-        print("Generating post content...")
-        content = generate_post_content()
-        print(f"Generated content:\n{content}\n")
+        # Resolve the person URN in the background while Groq is generating
+        urn_executor = ThreadPoolExecutor(max_workers=2)
+        urn_future = urn_executor.submit(_timed_urn_lookup)
+        
+        # A draft an earlier run couldn't publish goes out instead of a new one
+        entry = recover_outbox()
+        media = None
+        if entry:
+            print(f"Retrying unpublished draft from {entry['created_at']}...")
+        else:
+            # Media uploads alongside generation too
+            media_future = urn_executor.submit(_timed_media_upload, media_paths, urn_future) if media_paths else None
+            
+            # Generate content
+            print("Generating post content...")
+            plan = choose_plan()
+            with metrics.stage('generate'):
+                content = generate_post_content(plan=plan)
+            print(f"Generated content:\n{content}\n")
+            entry = outbox_add(content, media=media_paths, plan=plan_summary(plan))
+            media = media_future.result() if media_future else None
+        urn_executor.shutdown(wait=False)
         
         # Post to LinkedIn
         print("Posting to LinkedIn...")
-        response = post_to_linkedin(content)
-        
-        if response.status_code == 201:
+        if publish_outbox_entry(entry, person_urn=urn_future.result(), media=media):
             print("✅ Successfully posted to LinkedIn!")
-            save_post_record(content, 'success')
         else:
-            print(f"❌ Failed to post: {response.status_code}")
-            print(f"Response: {response.text}")
-            save_post_record(content, f'failed: {response.status_code}')
             exit(1)
             
     except Exception as e:
         print(f"❌ Error: {str(e)}")
-        save_post_record("", f'error: {str(e)}')
+        fields = {'outbox_key': entry['key']} if entry else {}
+        save_post_record(entry['content'] if entry else "", f'error: {str(e)}', **fields)
         exit(1)
 
+Draft = namedtuple('Draft', ['content', 'plan'])
+GenerateResult = namedtuple('GenerateResult', ['draft', 'error'])
+PublishResult = namedtuple('PublishResult', ['published', 'post_id', 'outbox_key', 'error'])
+
+class Poster:
+    """Generate, publish and record posts for one LinkedIn account
+
+    For long-running workers. Nothing is read from the environment: the
+    access token and LLM backends are passed in, and the history, outbox,
+    queue and caches live in `data_dir` under their configured names (None
+    keeps the configured locations, as from_env() does). Progress goes to
+    the linkedin_auto_poster logger; nothing is printed or exit()ed, and
+    generate, publish and post return a GenerateResult or PublishResult
+    with the error instead of raising. Stage timings and counters go to
+    `metrics`, by default a RunMetrics of this Poster's own that close()
+    (or leaving a `with` block) writes to the data directory's metrics files.
+
+    Every Poster in the process shares the keep-alive HTTP session and the
+    rate limiters. Methods are thread-safe; the a-prefixed variants run
+    them in a worker thread for asyncio callers.
+    """
+    
+    def __init__(self, access_token, data_dir, person_urn=None, llm_api_key=None, backends=None,
+                 account=None, metrics=None):
+        if not access_token:
+            raise Exception("Poster needs a LinkedIn access token")
+        self.access_token = access_token
+        self.data_dir = data_dir
+        self.account = account
+        self.metrics = RunMetrics('poster') if metrics is None else metrics
+        self._owns_metrics = metrics is None
+        self._person_urn = person_urn
+        self.lock = threading.Lock()
+        self.closed = False
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+        if llm_api_key and not backends:
+            backends = self._call(restore_llm_health, groq_backends(llm_api_key))
+        self.backends = backends
+    
+    @classmethod
+    def from_env(cls, metrics=None):
+        """The account, LLM backends and files the command line would use"""
+        return cls(LINKEDIN_ACCESS_TOKEN, None, person_urn=LINKEDIN_PERSON_URN, backends=llm_backends(), metrics=metrics)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Write this Poster's own metrics out; returns the metrics record (None if already closed)
+
+        A `metrics` passed in is left for the caller to finish.
+        """
+        with self.lock:
+            if self.closed:
+                return None
+            self.closed = True
+        if not self._owns_metrics:
+            return None
+        outcome = 'failed' if self.metrics.counters.get('posts_failed') else 'success'
+        return self._call(self.metrics.finish, outcome)
+    
+    def _call(self, fn, *args, **kwargs):
+        """Run fn with this Poster's data directory and metrics in effect"""
+        def call():
+            _poster_data_dir.set(self.data_dir)
+            _poster_metrics.set(self.metrics)
+            return fn(*args, **kwargs)
+        return contextvars.copy_context().run(call)
+    
+    def _resolved_urn(self):
+        with self.lock:
+            if not self._person_urn:
+                self._person_urn = resolve_person_urn(self.access_token)
+            return self._person_urn
+    
+    def generate(self, now=None, plan=None):
+        """A GenerateResult with a new Draft for `now`, or the reason there is none"""
+        return self._call(self._generate, now, plan)
+    
+    def _generate(self, now, plan):
+        if not self.backends:
+            return GenerateResult(None, "Poster has no LLM backends (pass llm_api_key or backends)")
+        try:
+            plan = plan or choose_plan(now)
+            with run_metrics().stage('generate'):
+                content = generate_post_content(now, plan, self.backends)
+        except Exception as e:
+            return GenerateResult(None, str(e))
+        return GenerateResult(Draft(content, plan_summary(plan)), None)
+    
+    def publish(self, draft, media_paths=None):
+        """Publish a Draft (or plain text) through the outbox; returns a PublishResult
+
+        Failures are in the history as well as in the result.
+        """
+        if isinstance(draft, str):
+            draft = Draft(draft, None)
+        return self._call(self._publish, draft, media_paths)
+    
+    def _publish(self, draft, media_paths):
+        try:
+            person_urn = self._resolved_urn()
+            fields = {'plan': draft.plan} if draft.plan else {}
+            entry = outbox_add(draft.content, media=media_paths, account=self.account, **fields)
+        except Exception as e:
+            self._record_error(draft.content, e)
+            return self._result(False, error=str(e))
+        return self._publish_entry(entry, person_urn)
+    
+    def _publish_entry(self, entry, person_urn):
+        try:
+            published = publish_outbox_entry(entry, person_urn, self.access_token)
+        except Exception as e:
+            self._record_error(entry['content'], e, outbox_key=entry['key'])
+            return self._result(False, entry, str(e))
+        return self._result(published, entry, None if published else entry.get('last_error'))
+    
+    def _result(self, published, entry=None, error=None):
+        self.metrics.add('posts_published' if published else 'posts_failed')
+        if entry is None:
+            return PublishResult(False, None, None, error)
+        return PublishResult(published, entry.get('post_id'), entry['key'], error)
+    
+    def record(self, content, status, **fields):
+        """Append a history record for this account (raises if the history can't be written)"""
+        self._call(self._record, content, status, **fields)
+    
+    def _record(self, content, status, **fields):
+        if self.account:
+            fields['account'] = self.account
+        save_post_record(content, status, **fields)
+    
+    def _record_error(self, content, error, **fields):
+        try:
+            self._record(content, f'error: {str(error)}', **fields)
+        except OSError as e:
+            # The result still carries the error
+            log.warning(f"⚠️ Couldn't record the failure in the history: {e}")
+    
+    def post(self, now=None, media_paths=None):
+        """Publish this account's unpublished outbox draft, or a new one; returns a PublishResult"""
+        return self._call(self._post, now, media_paths)
+    
+    def _post(self, now, media_paths):
+        try:
+            person_urn = self._resolved_urn()
+            entry = recover_outbox(self.account, person_urn, self.access_token)
+        except Exception as e:
+            return self._result(False, error=str(e))
+        if entry:
+            return self._publish_entry(entry, person_urn)
+        generated = self._generate(now, None)
+        if generated.error:
+            self._record_error("", generated.error)
+            return self._result(False, error=generated.error)
+        return self._publish(generated.draft, media_paths)
+    
+    async def agenerate(self, now=None, plan=None):
+        return await asyncio.to_thread(self.generate, now, plan)
+    
+    async def apublish(self, draft, media_paths=None):
+        return await asyncio.to_thread(self.publish, draft, media_paths)
+    
+    async def arecord(self, content, status, **fields):
+        return await asyncio.to_thread(self.record, content, status, **fields)
+    
+    async def apost(self, now=None, media_paths=None):
+        return await asyncio.to_thread(self.post, now, media_paths)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and publish LinkedIn posts")
+    parser.add_argument('--media', action='append',
+                        help="image or document to attach (repeatable; default from POST_MEDIA)")
+    commands = parser.add_subparsers(dest='command')
+    
+    batch_parser = commands.add_parser('batch', help="post for every account in a roster file")
+    batch_parser.add_argument('roster', help="JSON list of {name, access_token_env, person_urn}")
+    batch_parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY, help="accounts processed at once")
+    
+    ahead_parser = commands.add_parser('generate-ahead', help="queue drafts for upcoming scheduled slots")
+    ahead_parser.add_argument('count', type=int, nargs='?', default=2, help="number of upcoming slots to fill")
+    
+    commands.add_parser('publish', help="publish the next queued draft (generates live if the queue is empty)")
+    
+    sync_parser = commands.add_parser('sync-metrics', help="fetch likes, comments and impressions of published posts")
+    sync_parser.add_argument('--force', action='store_true', help="refresh every post, not just stale ones")
+    sync_parser.add_argument('--roster', help="batch roster file; its accounts' posts are synced with their own "
+                                              "tokens (without it only the main account's posts are)")
+    
+    optimize_parser = commands.add_parser('optimize', help="expected engagement per weekday, hour, format, industry and booster")
+    optimize_parser.add_argument('--top', type=int, default=3, help="options to show per dimension")
+    optimize_parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    
+    lint_parser = commands.add_parser('lint', help="style-check drafts (queued and outbox drafts by default)")
+    lint_parser.add_argument('files', nargs='*', help="text files to check instead")
+    lint_parser.add_argument('--json', action='store_true', help="print the reports as JSON")
+    
+    outbox_parser = commands.add_parser('outbox', help="list drafts waiting to be published")
+    outbox_parser.add_argument('--requeue', metavar='KEY', help="publish this draft again on the next run")
+    outbox_parser.add_argument('--drop', metavar='KEY', help="delete this draft")
+    
+    history_parser = commands.add_parser('history', help="statistics over the post history")
+    history_parser.add_argument('--top', type=int, default=5, help="number of error strings to show")
+    history_parser.add_argument('--weeks', type=int, default=8, help="number of recent weeks to show")
+    history_parser.add_argument('--since', type=datetime.fromisoformat, help="only records at or after this ISO date/time")
+    history_parser.add_argument('--until', type=datetime.fromisoformat, help="only records before this ISO date/time")
+    history_parser.add_argument('--failures', type=int, default=0, help="show this many of the most recent failed records")
+    history_parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    
+    # Read-only reports and housekeeping don't count as runs
+    if args.command in ('history', 'outbox', 'lint', 'optimize'):
+        run_command(args)
+        return
+    
+    metrics = start_run(args.command or 'post')
+    outcome = 'error'
+    try:
+        run_command(args)
+        outcome = 'success'
+    except SystemExit as e:
+        outcome = 'success' if not e.code else 'failed'
+        raise
+    finally:
+        record = metrics.finish(outcome)
+        print(f"📈 Run {record['run_id']}: {outcome} in {record['seconds']:.1f}s, "
+              f"{record['counters'].get('groq_prompt_tokens', 0)}+{record['counters'].get('groq_completion_tokens', 0)} Groq tokens")
+
+def run_command(args):
+    """Dispatch a parsed command line"""
+    if args.command == 'history':
+        report = history_report(top=args.top, weeks=args.weeks, since=args.since, until=args.until, failures=args.failures)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_history_report(report)
+    elif args.command == 'outbox':
+        outbox_command(args)
+    elif args.command == 'lint':
+        lint_command(args)
+    elif args.command == 'optimize':
+        report = EngagementOptimizer().report()
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_optimizer_report(report, top=args.top)
+    elif args.command == 'sync-metrics':
+        try:
+            with run_metrics().stage('sync'):
+                roster = load_roster(args.roster) if args.roster else None
+                fetched, fresh = sync_engagement(force=args.force, roster=roster)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            exit(1)
+        print(f"✅ Refreshed {fetched} post(s), {fresh} already up to date")
+        print_engagement()
+    elif args.command == 'generate-ahead':
+        try:
+            generate_ahead(args.count)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            exit(1)
+    elif args.command == 'publish':
+        try:
+            published = publish_next(args.media or POST_MEDIA)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            save_post_record("", f'error: {str(e)}')
+            exit(1)
+        if not published:
+            exit(1)
+    elif args.command == 'batch':
+        started = time.monotonic()
+        with run_metrics().stage('batch'):
+            results = asyncio.run(run_batch(load_roster(args.roster), args.concurrency))
+        failed = [name for name, status in results.items() if status != 'success']
+        print(f"Posted for {len(results) - len(failed)}/{len(results)} accounts in {time.monotonic() - started:.1f}s")
+        for name in failed:
+            print(f"❌ {name}: {results[name]}")
+        if failed:
+            exit(1)
+    else:
+        post_once(args.media or POST_MEDIA)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import linkedin_auto_poster as poster
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in a scratch directory with fresh process-wide singletons"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(poster, '_duplicate_indexes', {})
+    monkeypatch.setattr(poster, '_topic_planners', {})
+    monkeypatch.setattr(poster, '_llm_backends', None)
+    monkeypatch.setattr(poster, '_outbox_claims', set())
+    return tmp_path
+
+
+class FakeResponse:
+    def __init__(self, status_code, post_id=''):
+        self.status_code = status_code
+        self.headers = {'x-restli-id': post_id} if post_id else {}
+        self.text = ''
+
+    def json(self):
+        return {}
+
+
+@pytest.fixture
+def linkedin(monkeypatch):
+    """Records published texts and answers ugcPosts with the queued responses"""
+    state = {'responses': [], 'sent': [], 'published': {}}
+
+    def post_to_linkedin(content, person_urn=None, access_token=None, media=None):
+        state['sent'].append(content)
+        response = state['responses'].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def find_published_post(content, person_urn=None, access_token=None):
+        lookup = state['published']
+        if isinstance(lookup, Exception):
+            raise lookup
+        return lookup.get(content, '')
+
+    monkeypatch.setattr(poster, 'post_to_linkedin', post_to_linkedin)
+    monkeypatch.setattr(poster, 'find_published_post', find_published_post)
+    return state
@@ -0,0 +1,51 @@
+import json
+
+import linkedin_auto_poster as poster
+
+
+def test_impressions_stop_after_the_scope_is_refused_and_roster_posts_use_their_token(monkeypatch):
+    for i in range(5):
+        poster.save_post_record(f'main post {i}', 'success', post_id=f'urn:li:share:{i}')
+    poster.save_post_record('team post', 'success', post_id='urn:li:share:team', account='team')
+    poster.save_post_record('unknown post', 'success', post_id='urn:li:share:other', account='other')
+    impression_calls = []
+    social_calls = []
+
+    def fetch_impressions(post_id, access_token=None):
+        impression_calls.append((post_id, access_token))
+        return None if access_token is None else 7
+
+    def fetch_social_actions(post_ids, access_token=None):
+        social_calls.append((tuple(post_ids), access_token))
+        return {post_id: {'likes': 1, 'comments': 0} for post_id in post_ids}
+
+    monkeypatch.setattr(poster, '_fetch_impressions', fetch_impressions)
+    monkeypatch.setattr(poster, '_fetch_social_actions', fetch_social_actions)
+    monkeypatch.setattr(poster, 'ENGAGEMENT_CONCURRENCY', 1)
+    roster = [{'name': 'team', 'access_token': 'team-token', 'person_urn': None}]
+
+    assert poster.sync_engagement(roster=roster) == (6, 0)
+
+    assert [token for _, token in impression_calls] == [None, 'team-token']
+    assert (('urn:li:share:team',), 'team-token') in social_calls
+    cache = poster._load_engagement()
+    assert 'urn:li:share:other' not in cache
+    assert cache['urn:li:share:team']['impressions'] == 7
+    assert cache['urn:li:share:4']['impressions'] is None
+
+
+def test_optimizer_buckets_posts_by_utc_weekday_and_hour(monkeypatch):
+    poster.save_post_record('post', 'success', post_id='urn:li:share:1',
+                            published_at='2026-10-18T23:30:00-02:00')
+    poster.save_post_record('legacy post', 'success', post_id='urn:li:share:2')
+    with open(poster.ENGAGEMENT_FILE, 'w') as f:
+        json.dump({post_id: {'likes': 1, 'comments': 0, 'impressions': None}
+                   for post_id in ('urn:li:share:1', 'urn:li:share:2')}, f)
+
+    optimizer = poster.EngagementOptimizer()
+
+    # Sunday 23:30 at UTC-2 is Monday 01:30 UTC
+    assert optimizer.columns['weekday'][0] == 0
+    assert optimizer.columns['hour'][0] == 1
+    legacy = poster.datetime.now().astimezone(poster.timezone.utc)
+    assert optimizer.columns['hour'][1] in (legacy.hour, (legacy.hour - 1) % 24)
@@ -0,0 +1,83 @@
+import os
+import json
+
+import linkedin_auto_poster as poster
+
+
+def write_legacy(records):
+    with open(poster.LEGACY_HISTORY_FILE, 'w') as f:
+        json.dump(records, f)
+
+
+def legacy_records(count):
+    return [
+        {'timestamp': f'2024-0{1 + i % 2}-1{i}T08:00:00', 'content': f'post {i}', 'status': 'success'}
+        for i in range(count)
+    ]
+
+
+def test_migration_moves_legacy_array_to_jsonl():
+    records = legacy_records(3)
+    write_legacy(records)
+
+    assert poster.migrate_legacy_history() == 3
+
+    assert list(poster.iter_post_records()) == records
+    assert not os.path.exists(poster.LEGACY_HISTORY_FILE)
+    assert os.path.exists(poster.LEGACY_HISTORY_FILE + '.migrated')
+    assert poster.migrate_legacy_history() == 0
+
+
+def test_migration_rerun_after_crash_does_not_duplicate():
+    records = legacy_records(3)
+    write_legacy(records)
+    # A crash after the shard was written but before posts.json was retired
+    with open(poster.HISTORY_FILE, 'w') as f:
+        for record in records[:2]:
+            f.write(json.dumps(record) + '\n')
+
+    poster.migrate_legacy_history()
+
+    migrated = list(poster._read_jsonl(poster.HISTORY_FILE))
+    assert len(migrated) == 3
+    assert sorted(r['content'] for r in migrated) == ['post 0', 'post 1', 'post 2']
+
+
+def test_migration_splits_monthly_shards(monkeypatch):
+    monkeypatch.setattr(poster, 'HISTORY_SHARDING', 'monthly')
+    write_legacy(legacy_records(4))
+
+    poster.migrate_legacy_history()
+
+    assert poster.history_files() == ['posts-2024-01.jsonl', 'posts-2024-02.jsonl']
+    assert len(list(poster.iter_post_records())) == 4
+
+
+def test_save_post_record_migrates_then_appends():
+    write_legacy(legacy_records(2))
+
+    poster.save_post_record('new post', 'success')
+
+    contents = [record['content'] for record in poster.iter_post_records()]
+    assert contents == ['post 0', 'post 1', 'new post']
+
+
+def test_save_post_record_completes_torn_line():
+    with open(poster.HISTORY_FILE, 'w') as f:
+        f.write(json.dumps({'timestamp': '2024-01-01T08:00:00', 'content': 'a', 'status': 'success'}) + '\n')
+        f.write('{"timestamp": "2024-01-02T08:00:00", "cont')
+
+    poster.save_post_record('b', 'failed: 500')
+
+    assert [record['content'] for record in poster.iter_post_records()] == ['a', 'b']
+
+
+def test_first_record_is_indexed_once():
+    content = 'a post about retrieval augmented generation in production'
+    poster.save_post_record(content, 'success')
+
+    index = poster.duplicate_index()
+    assert len(index.signatures) == 1
+    assert all(len(keys) == 1 for bucket in index.buckets for keys in bucket.values())
+    with open(index.path, 'r') as f:
+        assert len(f.readlines()) == 2  # header and one signature
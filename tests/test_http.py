@@ -0,0 +1,38 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import linkedin_auto_poster as poster
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.seen.append(self.headers.get('Cookie'))
+        self.send_response(200)
+        self.send_header('Set-Cookie', f'session={self.headers["Authorization"]}; Path=/')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(poster, '_http_session', None)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), CookieHandler)
+    httpd.seen = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_cookies_set_for_one_account_are_not_sent_for_another(server):
+    url = f'http://127.0.0.1:{server.server_port}/v2/me'
+    poster.http_request('GET', url, headers={'Authorization': 'Bearer first'})
+    poster.http_request('GET', url, headers={'Authorization': 'Bearer second'})
+
+    assert server.seen == [None, None]
+    assert not poster.http_session().cookies
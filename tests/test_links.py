@@ -0,0 +1,56 @@
+import requests
+
+import linkedin_auto_poster as poster
+
+DRAFT = """Models fail quietly.
+
+Worth reading:
+→ https://example.com/alive
+→ https://example.com/gone"""
+
+
+def fake_http(monkeypatch, outcomes):
+    calls = []
+
+    def http_request(method, url, **kwargs):
+        calls.append(url)
+        outcome = outcomes[url]
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        return response
+
+    monkeypatch.setattr(poster, 'http_request', http_request)
+    return calls
+
+
+def test_dead_link_line_is_repaired(monkeypatch):
+    fake_http(monkeypatch, {'https://example.com/alive': 200, 'https://example.com/gone': 404})
+
+    assert poster.verify_links(DRAFT) == DRAFT.rsplit('\n', 1)[0]
+
+
+def test_publish_time_check_uses_only_the_cache(monkeypatch):
+    fake_http(monkeypatch, {'https://example.com/alive': 200, 'https://example.com/gone': 404})
+    poster.verify_links(DRAFT)
+    calls = fake_http(monkeypatch, {})
+
+    assert poster.verify_links(DRAFT, cached_only=True) == DRAFT.rsplit('\n', 1)[0]
+    assert calls == []
+
+
+def test_uncached_links_are_kept_without_requests(monkeypatch):
+    calls = fake_http(monkeypatch, {})
+
+    assert poster.verify_links(DRAFT, cached_only=True) == DRAFT
+    assert calls == []
+
+
+def test_client_side_errors_leave_links_unverified(monkeypatch):
+    fake_http(monkeypatch, {
+        'https://example.com/alive': requests.TooManyRedirects(),
+        'https://example.com/gone': requests.exceptions.SSLError(),
+    })
+
+    assert poster.verify_links(DRAFT) == DRAFT
@@ -0,0 +1,63 @@
+import pytest
+import requests
+
+import linkedin_auto_poster as poster
+
+
+def error_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{"error": "x"}'
+    return response
+
+
+@pytest.fixture
+def backend():
+    return poster.LLMBackend('test', 'http://127.0.0.1:9/v1/chat/completions', 'model', 'key')
+
+
+@pytest.mark.parametrize('status, counted', [(400, False), (422, False), (429, True), (503, True)])
+def test_only_backend_faults_count_toward_the_breaker(backend, monkeypatch, status, counted):
+    def request_completions(backend, data, timeout, retries=None):
+        raise poster.LLMRequestError(backend, error_response(status))
+
+    monkeypatch.setattr(poster, '_request_completions', request_completions)
+    for _ in range(poster.LLM_BREAKER_FAILURES):
+        with pytest.raises(poster.LLMRequestError):
+            poster._timed_completions(backend, {}, 5)
+
+    assert backend.available() is not counted
+    assert backend.failures == (poster.LLM_BREAKER_FAILURES if counted else 0)
+
+
+def test_deadline_timeouts_do_not_count_toward_the_breaker(backend, monkeypatch):
+    calls = []
+
+    def request_completions(backend, data, timeout, retries=None):
+        calls.append((timeout, retries))
+        raise requests.ReadTimeout()
+
+    monkeypatch.setattr(poster, '_request_completions', request_completions)
+    for _ in range(poster.LLM_BREAKER_FAILURES):
+        with pytest.raises(requests.Timeout):
+            poster._timed_completions(backend, {}, 2)
+
+    assert backend.failures == 0 and backend.available()
+    assert calls[0] == (2, 0)
+
+    with pytest.raises(requests.Timeout):
+        poster._timed_completions(backend, {}, backend.timeout)
+    assert backend.failures == 1
+
+
+def test_hedged_calls_never_outlive_the_deadline(monkeypatch):
+    slow = poster.LLMBackend('slow', 'http://127.0.0.1:9/a', 'model', 'key', timeout=60)
+    timeouts = []
+
+    def timed_completions(backend, data, timeout):
+        timeouts.append(timeout)
+        return [], 0
+
+    monkeypatch.setattr(poster, '_timed_completions', timed_completions)
+    assert poster._hedged_completion({}, 0.5, backends=[slow]) == (None, 0)
+    assert timeouts and all(timeout <= 0.5 for timeout in timeouts)
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+import linkedin_auto_poster as poster
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / 'image.png'
+    path.write_bytes(os.urandom(10_000))
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk, ceiling', [(1024, 4096), (4096, 1000), (3000, 3000)])
+def test_mapped_range_yields_every_byte(media_file, monkeypatch, chunk, ceiling):
+    monkeypatch.setattr(poster, 'MEDIA_CHUNK_SIZE', chunk)
+    budget = poster.MemoryBudget(ceiling)
+    with open(media_file, 'rb') as f:
+        data = f.read()
+
+    body = poster.MappedRange(media_file, 1234, 9000, budget)
+
+    assert b''.join(body) == data[1234:9000]
+    assert len(body) == 9000 - 1234
+    assert budget.available == ceiling
+
+
+def test_mapped_range_can_be_resent(media_file):
+    body = poster.MappedRange(media_file, 0, 10_000)
+
+    assert b''.join(body) == b''.join(body)
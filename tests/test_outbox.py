@@ -0,0 +1,109 @@
+import pytest
+import requests
+
+import linkedin_auto_poster as poster
+from conftest import FakeResponse
+
+
+def history():
+    return list(poster.iter_post_records())
+
+
+def test_published_entry_is_recorded_once_and_removed(linkedin):
+    linkedin['responses'].append(FakeResponse(201, 'urn:li:share:1'))
+    entry = poster.outbox_add('hello')
+
+    assert poster.publish_outbox_entry(entry, 'member')
+
+    assert poster.outbox_entries() == []
+    [record] = history()
+    assert record['post_id'] == 'urn:li:share:1' and record['outbox_key'] == entry['key']
+
+
+def test_crash_after_record_before_removal_is_not_recorded_twice(linkedin):
+    entry = poster.outbox_add('hello')
+    entry.update(state='published', post_id='urn:li:share:1')
+    poster._outbox_save(entry)
+    poster._release_outbox_entry(entry['key'])
+    # The earlier run wrote its record, then crashed before removing the entry
+    poster.save_post_record('hello', 'success', post_id='urn:li:share:1', outbox_key=entry['key'])
+
+    assert poster.recover_outbox() is None
+
+    assert poster.outbox_entries() == []
+    assert len(history()) == 1
+
+
+def test_crash_before_record_is_recorded_on_recovery(linkedin):
+    entry = poster.outbox_add('hello')
+    entry.update(state='published', post_id='urn:li:share:1')
+    poster._outbox_save(entry)
+    poster._release_outbox_entry(entry['key'])
+
+    assert poster.recover_outbox() is None
+
+    [record] = history()
+    assert record['outbox_key'] == entry['key']
+
+
+def test_lost_response_is_found_on_linkedin_not_resent(linkedin):
+    linkedin['responses'].append(requests.ReadTimeout())
+    entry = poster.outbox_add('hello')
+    with pytest.raises(requests.ReadTimeout):
+        poster.publish_outbox_entry(entry, 'member')
+    assert poster.outbox_entries()[0]['state'] == 'sending'
+    linkedin['published']['hello'] = 'urn:li:share:7'
+
+    assert poster.recover_outbox(person_urn='member') is None
+
+    assert linkedin['sent'] == ['hello']
+    assert [record['post_id'] for record in history()] == ['urn:li:share:7']
+
+
+def test_sending_entry_not_on_linkedin_is_retried(linkedin):
+    linkedin['responses'] += [requests.ReadTimeout(), FakeResponse(201, 'urn:li:share:2')]
+    entry = poster.outbox_add('hello')
+    with pytest.raises(requests.ReadTimeout):
+        poster.publish_outbox_entry(entry, 'member')
+
+    retry = poster.recover_outbox(person_urn='member')
+    assert retry['key'] == entry['key'] and retry['state'] == 'pending'
+    assert poster.publish_outbox_entry(retry, 'member')
+
+    assert linkedin['sent'] == ['hello', 'hello']
+    assert poster.outbox_entries() == []
+
+
+def test_sending_entry_is_left_alone_when_lookup_fails(linkedin):
+    linkedin['responses'].append(requests.ReadTimeout())
+    entry = poster.outbox_add('hello')
+    with pytest.raises(requests.ReadTimeout):
+        poster.publish_outbox_entry(entry, 'member')
+    linkedin['published'] = Exception('403')
+
+    assert poster.recover_outbox(person_urn='member') is None
+
+    assert poster.outbox_entries()[0]['state'] == 'sending'
+    assert linkedin['sent'] == ['hello']
+
+
+def test_rejected_and_server_errors(linkedin):
+    linkedin['responses'] += [FakeResponse(422), FakeResponse(503)]
+    rejected = poster.outbox_add('rejected')
+    unclear = poster.outbox_add('unclear')
+
+    assert not poster.publish_outbox_entry(rejected, 'member')
+    assert not poster.publish_outbox_entry(unclear, 'member')
+
+    states = {entry['content']: entry['state'] for entry in poster.outbox_entries()}
+    # A 4xx created nothing and can be retried; a 5xx might have, so it's checked first
+    assert states == {'rejected': 'pending', 'unclear': 'sending'}
+    assert [record['status'] for record in history()] == ['failed: 422', 'failed: 503']
+
+
+def test_claimed_entry_is_skipped_by_other_threads(linkedin):
+    entry = poster.outbox_add('hello')
+
+    assert poster.recover_outbox() is None
+    poster._release_outbox_entry(entry['key'])
+    assert poster.recover_outbox()['key'] == entry['key']
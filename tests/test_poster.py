@@ -0,0 +1,71 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import linkedin_auto_poster as poster
+from conftest import FakeResponse
+
+
+def fake_backend():
+    return poster.LLMBackend('fake', 'http://127.0.0.1:9/v1/chat/completions', 'model', 'key')
+
+
+def read_jsonl(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_poster_keeps_its_state_and_metrics_in_its_data_dir(workdir, linkedin, monkeypatch, capsys):
+    monkeypatch.setattr(poster, 'generate_post_content',
+                        lambda now=None, plan=None, backends=None: f'a post written by {backends[0].name}')
+    linkedin['responses'] = [FakeResponse(201, 'urn:li:share:1')]
+    data_dir = workdir / 'team'
+
+    with poster.Poster('token', str(data_dir), person_urn='abc', backends=[fake_backend()], account='team') as team:
+        result = team.post()
+
+    assert result == poster.PublishResult(True, 'urn:li:share:1', result.outbox_key, None)
+    assert linkedin['sent'] == ['a post written by fake']
+    assert capsys.readouterr().out == ''
+    assert os.listdir(workdir) == ['team']
+    [record] = read_jsonl(data_dir / 'posts.jsonl')
+    assert (record['status'], record['account'], record['post_id']) == ('success', 'team', 'urn:li:share:1')
+    [run] = read_jsonl(data_dir / 'metrics.jsonl')
+    assert run['command'] == 'poster' and run['counters']['posts_published'] == 1
+    assert {'generate', 'record'} <= set(run['stages'])
+    assert 'posts_published' not in poster.run_metrics().counters
+
+
+def test_failures_come_back_as_results(workdir, monkeypatch):
+    data_dir = workdir / 'data'
+    assert poster.Poster('token', str(data_dir)).generate().draft is None
+
+    def generate_post_content(now=None, plan=None, backends=None):
+        raise Exception("no acceptable draft")
+
+    monkeypatch.setattr(poster, 'generate_post_content', generate_post_content)
+    account = poster.Poster('token', str(data_dir), person_urn='abc', backends=[fake_backend()])
+
+    assert account.generate() == poster.GenerateResult(None, "no acceptable draft")
+    assert account.post() == poster.PublishResult(False, None, None, "no acceptable draft")
+    [record] = read_jsonl(data_dir / 'posts.jsonl')
+    assert record['status'] == 'error: no acceptable draft'
+
+
+def test_worker_threads_see_the_callers_data_dir(workdir):
+    account = poster.Poster('token', str(workdir / 'data'))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        inside = account._call(lambda: poster._submit(executor, poster.state_path, 'posts.jsonl').result())
+        outside = poster._submit(executor, poster.state_path, 'posts.jsonl').result()
+
+    assert inside == str(workdir / 'data' / 'posts.jsonl')
+    assert outside == 'posts.jsonl'
+
+
+def test_an_explicit_token_never_gets_the_environments_urn(monkeypatch):
+    monkeypatch.setattr(poster, 'LINKEDIN_ACCESS_TOKEN', 'env-token')
+    monkeypatch.setattr(poster, 'LINKEDIN_PERSON_URN', 'env-urn')
+    monkeypatch.setattr(poster, 'get_person_urn', lambda access_token=None: f'urn-of-{access_token}')
+
+    assert poster.resolve_person_urn() == 'env-urn'
+    assert poster.resolve_person_urn('env-token') == 'urn-of-env-token'
@@ -0,0 +1,87 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import linkedin_auto_poster as poster
+from conftest import FakeResponse
+
+
+def queue_draft(slot, content):
+    os.makedirs(poster.QUEUE_DIR, exist_ok=True)
+    draft = {'slot': slot.isoformat(), 'generated_at': '2030-01-01T00:00:00', 'content': content}
+    path = poster._queue_path(slot)
+    with open(path, 'w') as f:
+        json.dump(draft, f)
+    return path, draft
+
+
+@pytest.fixture
+def live_posts(monkeypatch):
+    calls = []
+    monkeypatch.setattr(poster, 'post_once', lambda media_paths=None: calls.append(media_paths))
+    return calls
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+
+
+def test_due_draft_goes_out_through_the_outbox(linkedin, live_posts):
+    linkedin['responses'].append(FakeResponse(201, 'urn:li:share:1'))
+    path, draft = queue_draft(utcnow() - timedelta(minutes=5), 'Queued post.')
+
+    assert poster.publish_next()
+
+    assert linkedin['sent'] == ['Queued post.']
+    assert not os.listdir(poster.QUEUE_DIR)
+    [record] = poster.iter_post_records()
+    assert record['outbox_key'] == poster._draft_key(draft) and record['slot'] == draft['slot']
+    assert live_posts == []
+
+
+def test_future_draft_waits_for_its_slot(linkedin, live_posts):
+    path, _ = queue_draft(utcnow() + timedelta(days=3), 'Next week.')
+
+    poster.publish_next()
+
+    assert linkedin['sent'] == []
+    assert os.path.exists(path)
+    assert live_posts == [None]
+
+
+def claim(path, age):
+    claimed = path[:-len('.json')] + f'.{int(time.time() - age)}.publishing'
+    os.rename(path, claimed)
+    return claimed
+
+
+def test_abandoned_claim_returns_to_the_queue():
+    path, _ = queue_draft(utcnow(), 'Claimed then crashed.')
+    claimed = claim(path, poster.QUEUE_CLAIM_TIMEOUT + 1)
+
+    poster.release_stale_claims()
+
+    assert os.path.exists(path) and not os.path.exists(claimed)
+
+
+def test_recent_claim_is_left_to_its_publisher():
+    path, _ = queue_draft(utcnow(), 'Being published.')
+    claimed = claim(path, 1)
+
+    poster.release_stale_claims()
+
+    assert os.path.exists(claimed) and not os.path.exists(path)
+
+
+def test_claim_already_in_the_outbox_is_not_requeued():
+    path, draft = queue_draft(utcnow(), 'Crashed after the outbox write.')
+    poster.outbox_add(draft['content'], key=poster._draft_key(draft))
+    claim(path, poster.QUEUE_CLAIM_TIMEOUT + 1)
+
+    poster.release_stale_claims()
+
+    assert not os.listdir(poster.QUEUE_DIR)
+    assert len(poster.outbox_entries()) == 1
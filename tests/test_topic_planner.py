@@ -0,0 +1,53 @@
+import os
+import json
+
+import linkedin_auto_poster as poster
+
+
+def queue_draft(name, plan):
+    os.makedirs(poster.QUEUE_DIR, exist_ok=True)
+    with open(os.path.join(poster.QUEUE_DIR, f'{name}.json'), 'w') as f:
+        json.dump({'slot': name, 'content': 'draft', 'plan': plan}, f)
+
+
+def test_queued_drafts_are_not_repeated_across_processes():
+    picks = []
+    for i in range(3):
+        # A fresh planner per run, as in separate generate-ahead processes
+        pick = poster.TopicPlanner().choose()
+        picks.append(pick)
+        queue_draft(f'2030-01-0{i + 1}T0800', pick)
+
+    assert len({pick['planned_topic'] for pick in picks}) == 3
+    assert len({pick['planned_research_source'] for pick in picks}) == 3
+    assert len({pick['planned_industry_source'] for pick in picks}) == 3
+
+
+def test_outbox_drafts_count_as_used():
+    first = poster.TopicPlanner().choose()
+    poster.outbox_add('draft', plan=first)
+
+    second = poster.TopicPlanner().choose()
+
+    assert second['planned_topic'] != first['planned_topic']
+
+
+def test_history_plan_is_used_without_alias_matches():
+    first = poster.TopicPlanner().choose()
+    # Nothing in the text names the topic or the sources
+    poster.save_post_record('An unrelated post.', 'success', plan=first)
+
+    second = poster.TopicPlanner().choose()
+
+    assert second['planned_topic'] != first['planned_topic']
+    assert second['planned_research_source'] != first['planned_research_source']
+
+
+def test_plan_summary_keeps_planned_topic_and_sources(monkeypatch):
+    monkeypatch.setattr(poster, 'TOPIC_PLANNER', True)
+    plan = poster.choose_plan()
+
+    summary = poster.plan_summary(plan)
+
+    for field in poster.PLANNED_FIELDS:
+        assert summary[field] == plan[field]